@@ -3,6 +3,5 @@
 # Activate the virtual environment
 source .venv/bin/activate
 
-# Run the application
-python3 src/main.py
-cd public && python3 -m http.server 8888
\ No newline at end of file
+# Build the site, serve ./docs on port 8888 and rebuild changed pages on save
+python3 src/main.py serve --watch --port 8888
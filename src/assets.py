@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import posixpath
+import shutil
+
+from fileio import atomic_write, file_digest, remove_empty_parents, save_json
+
+DEFAULT_STATIC_STATE_PATH = "./.cache/static-manifest.json"
+DEFAULT_ASSET_HASHES_PATH = "./.cache/asset-hashes.json"
+# Written to the output root: original URL -> fingerprinted URL
+ASSET_MANIFEST = "asset-manifest.json"
+# Assets pages load by URL; others (favicon.ico, robots.txt, ...) are fetched by fixed names
+FINGERPRINTED = frozenset((
+    ".css", ".js", ".mjs", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".svg",
+    ".woff", ".woff2", ".ttf", ".otf",
+))
+FINGERPRINT_LENGTH = 10
+# Linux FICLONE ioctl: share the source extents (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+
+def reflink(source: str, target: str) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            return False
+    shutil.copystat(source, target)
+    return True
+
+
+def transfer_file(source: str, target: str, hardlink: bool = False) -> str:
+    # Writes to a temporary sibling and renames it so readers never see a partial file
+    tmp_path = target + ".sync-tmp"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    method = "copied"
+    try:
+        if hardlink:
+            try:
+                os.link(source, tmp_path)
+                method = "linked"
+            except OSError:
+                shutil.copy2(source, tmp_path)
+        elif reflink(source, tmp_path):
+            method = "reflinked"
+        else:
+            shutil.copy2(source, tmp_path)
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+    return method
+
+
+def is_unchanged(source: str, source_stat, target: str, checksum: bool = False) -> bool:
+    try:
+        target_stat = os.stat(target)
+    except FileNotFoundError:
+        return False
+    if os.path.samestat(source_stat, target_stat):
+        return True
+    if source_stat.st_size != target_stat.st_size:
+        return False
+    if source_stat.st_mtime_ns == target_stat.st_mtime_ns:
+        return True
+    if checksum and file_digest(source) == file_digest(target):
+        # Same bytes, only the timestamp drifted; align it so the next check is a stat
+        os.utime(target, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+        return True
+    return False
+
+
+def load_synced(state_path: str) -> list:
+    try:
+        with open(state_path, "r") as f:
+            return json.load(f).get("files", [])
+    except (OSError, ValueError):
+        return []
+
+
+def save_synced(state_path: str, files: list):
+    save_json(state_path, {"files": files})
+
+
+def fingerprint_path(path: str, digest: str) -> str:
+    root, ext = posixpath.splitext(path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+
+class AssetManifest():
+    # urls maps the root-relative URL of every fingerprinted asset to the URL
+    # of its content-hashed copy. Equal manifests hash equal, so a manifest can
+    # be part of cache keys.
+    def __init__(self, urls: dict):
+        self.urls = urls
+        self.digest = hashlib.sha256(json.dumps(urls, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def resolve(self, url: str) -> str:
+        # url with its path swapped for the fingerprinted one, query and fragment kept
+        cut = len(url)
+        for separator in "?#":
+            index = url.find(separator)
+            if index != -1:
+                cut = min(cut, index)
+        fingerprinted = self.urls.get(url[:cut])
+        if fingerprinted is None:
+            return url
+        return fingerprinted + url[cut:]
+
+    def __eq__(self, other):
+        return isinstance(other, AssetManifest) and self.digest == other.digest
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def __repr__(self):
+        return f"AssetManifest({self.urls})"
+
+
+def asset_manifest(source_dir: str, hashes_path: str = None) -> AssetManifest:
+    # Fingerprints every asset type in FINGERPRINTED under source_dir. Hashes
+    # are cached by (mtime, size) in hashes_path so unchanged assets are not
+    # read again.
+    hashes_path = hashes_path or DEFAULT_ASSET_HASHES_PATH
+    try:
+        with open(hashes_path, "r") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = {}
+    hashes = {}
+    assets = {}
+    for directory, dirs, files in os.walk(source_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if os.path.splitext(file)[1].lower() not in FINGERPRINTED:
+                continue
+            source = os.path.join(directory, file)
+            stat = os.stat(source)
+            url = "/" + os.path.relpath(source, source_dir).replace(os.sep, "/")
+            entry = cached.get(url)
+            if entry is None or entry[:2] != [stat.st_mtime_ns, stat.st_size]:
+                entry = [stat.st_mtime_ns, stat.st_size, file_digest(source)]
+            hashes[url] = entry
+            assets[url] = fingerprint_path(url, entry[2])
+    if hashes != cached:
+        save_json(hashes_path, hashes)
+    return AssetManifest(assets)
+
+
+def write_asset_manifest(target_dir: str, assets: AssetManifest) -> str:
+    path = os.path.join(target_dir, ASSET_MANIFEST)
+    atomic_write(path, json.dumps(assets.urls, indent=1, sort_keys=True) + "\n")
+    return path
+
+
+def asset_targets(rel_path: str, assets: AssetManifest = None) -> list:
+    # Output paths (relative, OS separators) of a static file: its own name,
+    # plus its fingerprinted copy if assets lists one
+    targets = [rel_path]
+    if assets is not None:
+        fingerprinted = assets.urls.get("/" + rel_path.replace(os.sep, "/"))
+        if fingerprinted is not None:
+            targets.append(os.path.normpath(fingerprinted[1:]))
+    return targets
+
+
+def sync_static(source_dir: str, target_dir: str, state_path: str = None, checksum: bool = False, hardlink: bool = False, assets: AssetManifest = None) -> dict:
+    # Mirrors source_dir into target_dir without touching files it did not put
+    # there (the rendered pages). state_path remembers which files were synced
+    # so that files deleted from source_dir can be removed from target_dir.
+    # Assets listed in assets (see asset_manifest) also get a fingerprinted
+    # copy; the original name is kept for url() references in CSS and
+    # external links.
+    state_path = state_path or DEFAULT_STATIC_STATE_PATH
+    stats = {"copied": 0, "linked": 0, "reflinked": 0, "unchanged": 0, "removed": 0}
+    synced = []
+    for directory, dirs, files in os.walk(source_dir):
+        dirs.sort()
+        rel_dir = os.path.relpath(directory, source_dir)
+        os.makedirs(os.path.normpath(os.path.join(target_dir, rel_dir)), exist_ok=True)
+        for file in sorted(files):
+            source = os.path.join(directory, file)
+            source_stat = os.stat(source)
+            for rel_path in asset_targets(os.path.normpath(os.path.join(rel_dir, file)), assets):
+                target = os.path.join(target_dir, rel_path)
+                synced.append(rel_path)
+                if is_unchanged(source, source_stat, target, checksum):
+                    stats["unchanged"] += 1
+                    continue
+                stats[transfer_file(source, target, hardlink)] += 1
+
+    current = set(synced)
+    for rel_path in load_synced(state_path):
+        if rel_path in current:
+            continue
+        target = os.path.join(target_dir, rel_path)
+        if os.path.lexists(target):
+            os.remove(target)
+            stats["removed"] += 1
+        remove_empty_parents(os.path.dirname(target), target_dir)
+    save_synced(state_path, synced)
+    return stats
@@ -0,0 +1,68 @@
+# Throughput of block splitting + classification: the original split("\n\n")
+# and startswith chain against the single-pass line scanner.
+# Run from src/: python3 -m benchmarks.blocks [pages]
+import re
+import sys
+import timeit
+
+from benchmarks.corpus import CorpusGenerator
+from helper import markdown_to_typed_blocks
+from textnode import BlockType
+
+
+def split_blocks(markdown: str) -> list:
+    blocks = markdown.split("\n\n")
+    filtered_blocks = []
+    for block in blocks:
+        block = block.strip()
+        if block == "":
+            continue
+        filtered_blocks.append(block)
+    return filtered_blocks
+
+
+def startswith_block_type(markdown: str) -> BlockType:
+    if re.match(r"#{1,6} .+", markdown) is not None:
+        return BlockType.HEADING
+    if markdown.startswith("```") and markdown.endswith("```"):
+        return BlockType.CODE
+    if markdown.startswith("> "):
+        return BlockType.QUOTE
+    if markdown.startswith("- ") or markdown.startswith("* "):
+        return BlockType.UNORDERED_LIST
+    if any(markdown.startswith(f"{i}. ") for i in range(1, 10)):
+        return BlockType.ORDERED_LIST
+    return BlockType.PARAGRAPH
+
+
+def split_and_classify(markdown: str) -> list:
+    return [(block, startswith_block_type(block)) for block in split_blocks(markdown)]
+
+
+def run(pages: int = 200, number: int = 5) -> tuple:
+    # Returns (MB of markdown, before MB/s, after MB/s)
+    generator = CorpusGenerator(seed=3)
+    documents = [generator.page(i) for i in range(pages)]
+    for document in documents:
+        if split_and_classify(document) != markdown_to_typed_blocks(document):
+            raise AssertionError("scanner output differs from split + classify")
+    size = sum(len(document) for document in documents) / 1e6
+
+    def throughput(func) -> float:
+        seconds = min(timeit.repeat(lambda: [func(document) for document in documents], number=number, repeat=3))
+        return size * number / seconds
+
+    return size, throughput(split_and_classify), throughput(markdown_to_typed_blocks)
+
+
+def main(argv: list = None):
+    argv = argv if argv is not None else sys.argv[1:]
+    pages = int(argv[0]) if argv else 200
+    size, before, after = run(pages)
+    print(f"{pages} pages, {size:.2f} MB of markdown")
+    print(f"split + classify: {before:>8.1f} MB/s")
+    print(f"line scanner:     {after:>8.1f} MB/s ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# Deterministic synthetic content generator for benchmarks.
+# Run from src/: python3 -m benchmarks.corpus OUT_DIR --pages 10000 --seed 1
+import argparse
+import os
+import random
+import sys
+
+WORDS = (
+    "elf ring hobbit shire road mountain river forest tower king wizard song "
+    "star moon stone sword ship grey white river valley gate lamp tree light "
+    "shadow dwarf horse bridge fire water wind journey map tale rune key"
+).split()
+
+DEFAULT_MIX = {
+    "paragraph": 5,
+    "heading": 2,
+    "unordered_list": 2,
+    "ordered_list": 1,
+    "code": 1,
+    "quote": 1,
+}
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <meta charset="utf-8" />
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+
+class CorpusGenerator():
+    def __init__(self, seed: int = 1, mix: dict = None, blocks_per_page: int = 20, links: float = 0.15, images: float = 0.03):
+        self.rng = random.Random(seed)
+        self.mix = dict(mix or DEFAULT_MIX)
+        self.kinds = list(self.mix)
+        self.weights = [self.mix[kind] for kind in self.kinds]
+        self.blocks_per_page = blocks_per_page
+        # probability that an inline token is a link / image
+        self.links = links
+        self.images = images
+
+    def words(self, count: int) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(count))
+
+    def inline(self, count: int) -> str:
+        # Inline markup stays balanced so every generated page is valid input
+        parts = []
+        for _ in range(count):
+            roll = self.rng.random()
+            if roll < self.images:
+                parts.append(f"![{self.words(2)}](/images/{self.rng.choice(WORDS)}.png)")
+            elif roll < self.images + self.links:
+                parts.append(f"[{self.words(2)}](/{self.rng.choice(WORDS)}/{self.rng.randrange(1000)})")
+            elif roll < self.images + self.links + 0.05:
+                parts.append(f"**{self.words(2)}**")
+            elif roll < self.images + self.links + 0.08:
+                parts.append(f"_{self.words(2)}_")
+            elif roll < self.images + self.links + 0.10:
+                parts.append(f"`{self.rng.choice(WORDS)}()`")
+            else:
+                parts.append(self.rng.choice(WORDS))
+        return " ".join(parts)
+
+    def block(self, kind: str) -> str:
+        if kind == "heading":
+            return "#" * self.rng.randint(2, 6) + " " + self.inline(self.rng.randint(2, 6))
+        if kind == "unordered_list":
+            return "\n".join("- " + self.inline(self.rng.randint(3, 12)) for _ in range(self.rng.randint(2, 8)))
+        if kind == "ordered_list":
+            return "\n".join(f"{i}. " + self.inline(self.rng.randint(3, 12)) for i in range(1, self.rng.randint(3, 9)))
+        if kind == "code":
+            lines = [f"func {self.rng.choice(WORDS)}() {{"]
+            lines += [f"    {self.rng.choice(WORDS)} = {self.rng.randrange(100)}" for _ in range(self.rng.randint(1, 8))]
+            lines.append("}")
+            return "```\n" + "\n".join(lines) + "\n```"
+        if kind == "quote":
+            return "\n".join("> " + self.inline(self.rng.randint(5, 15)) for _ in range(self.rng.randint(1, 4)))
+        return "\n".join(self.inline(self.rng.randint(8, 20)) for _ in range(self.rng.randint(1, 6)))
+
+    def page(self, index: int) -> str:
+        blocks = [f"# Page {index}: {self.words(3)}"]
+        for kind in self.rng.choices(self.kinds, self.weights, k=self.blocks_per_page):
+            blocks.append(self.block(kind))
+        return "\n\n".join(blocks) + "\n"
+
+    def write(self, out_dir: str, pages: int, per_dir: int = 100) -> str:
+        # Writes out_dir/content/sNNN/pageNNNNN.md plus out_dir/template.html;
+        # returns the content directory
+        content_dir = os.path.join(out_dir, "content")
+        for index in range(pages):
+            directory = os.path.join(content_dir, f"s{index // per_dir:04d}")
+            if index % per_dir == 0:
+                os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"page{index:06d}.md"), "w") as f:
+                f.write(self.page(index))
+        with open(os.path.join(out_dir, "template.html"), "w") as f:
+            f.write(TEMPLATE)
+        return content_dir
+
+
+def parse_mix(value: str) -> dict:
+    # "paragraph=5,code=1" -> {"paragraph": 5, "code": 1}
+    mix = {}
+    for item in value.split(","):
+        kind, _, weight = item.partition("=")
+        if kind not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown block kind: {kind}")
+        mix[kind] = float(weight)
+    return mix
+
+
+def add_corpus_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--pages", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--blocks", type=int, default=20, help="blocks per page")
+    parser.add_argument("--mix", type=parse_mix, default=None,
+                        help="block weights, e.g. paragraph=5,heading=2,code=1")
+    parser.add_argument("--links", type=float, default=0.15, help="share of inline tokens that are links")
+    parser.add_argument("--images", type=float, default=0.03, help="share of inline tokens that are images")
+
+
+def generator_from_args(args) -> CorpusGenerator:
+    return CorpusGenerator(args.seed, args.mix, args.blocks, args.links, args.images)
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic content tree")
+    parser.add_argument("out_dir")
+    add_corpus_arguments(parser)
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    content_dir = generator_from_args(args).write(args.out_dir, args.pages)
+    print(f"Wrote {args.pages} pages to {content_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Per-call cost of the inline extractors on plain prose and on marked-up text.
+# Run from src/: python3 -m benchmarks.extractors
+import re
+import sys
+import timeit
+
+from helper import extract_markdown_images, extract_markdown_links, is_md_heading
+
+PROSE = (
+    "It can be enjoyed by children and adults alike, and you can spend years "
+    "studying the legendarium and still not understand its depths."
+)
+MARKUP = PROSE + " See [the index](/blog) and ![a map](/images/map.png)."
+HEADING = "## Reasons I like Tolkien"
+
+
+def uncompiled_images(text: str) -> list:
+    return re.findall(r"!\[(.*?)\]\((.*?)\)", text)
+
+
+def uncompiled_links(text: str) -> list:
+    return re.findall(r"(?<!!)\[(.*?)\]\((.*?)\)", text)
+
+
+def uncompiled_heading(block: str) -> bool:
+    return re.match(r"^#{1,6} .+", block) is not None
+
+
+CASES = [
+    ("images/prose", uncompiled_images, extract_markdown_images, PROSE),
+    ("images/markup", uncompiled_images, extract_markdown_images, MARKUP),
+    ("links/prose", uncompiled_links, extract_markdown_links, PROSE),
+    ("links/markup", uncompiled_links, extract_markdown_links, MARKUP),
+    ("heading/prose", uncompiled_heading, is_md_heading, PROSE),
+    ("heading/heading", uncompiled_heading, is_md_heading, HEADING),
+]
+
+
+def per_call_ns(func, arg, number: int) -> float:
+    return min(timeit.repeat(lambda: func(arg), number=number, repeat=5)) / number * 1e9
+
+
+def run(number: int = 100_000) -> list:
+    results = []
+    for name, before, after, text in CASES:
+        if before(text) != after(text):
+            raise AssertionError(f"{name}: extractor output changed")
+        results.append((name, per_call_ns(before, text, number), per_call_ns(after, text, number)))
+    return results
+
+
+def main(argv: list = None):
+    argv = argv if argv is not None else sys.argv[1:]
+    number = int(argv[0]) if argv else 100_000
+    print(f"{'case':>16} {'re.* ns':>9} {'compiled ns':>12} {'speedup':>8}")
+    for name, before, after in run(number):
+        print(f"{name:>16} {before:>9.0f} {after:>12.0f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
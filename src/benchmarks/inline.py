@@ -0,0 +1,58 @@
+# Compares text_to_textnodes against the original chain of split_nodes_* passes.
+# Run from src/: python3 -m benchmarks.inline
+import sys
+import timeit
+
+from helper import (
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+)
+from textnode import TextNode, TextType
+
+
+def chained_text_to_textnodes(text: str) -> list:
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    return nodes
+
+
+def make_paragraph(links: int) -> str:
+    parts = []
+    for i in range(links):
+        parts.append(
+            f"Release {i} has **bold notes**, _italic caveats_, `code{i}` and a "
+            f"[changelog entry](https://example.com/changes/{i}) with ![badge {i}](/images/b{i}.png)."
+        )
+    return " ".join(parts)
+
+
+def make_link_list(links: int) -> str:
+    return " ".join(f"[#{i}](https://example.com/pull/{i})" for i in range(links))
+
+
+def bench(text: str, number: int) -> tuple:
+    if chained_text_to_textnodes(text) != text_to_textnodes(text):
+        raise AssertionError("tokenizer output differs from the chained passes")
+    chained = min(timeit.repeat(lambda: chained_text_to_textnodes(text), number=number, repeat=3)) / number
+    single = min(timeit.repeat(lambda: text_to_textnodes(text), number=number, repeat=3)) / number
+    return len(text), chained, single
+
+
+def main(argv: list = None):
+    sizes = [int(arg) for arg in (argv if argv is not None else sys.argv[1:])] or [10, 100, 500, 1000]
+    print(f"{'shape':>10} {'links':>6} {'chars':>8} {'chained ms':>11} {'single ms':>10} {'speedup':>8}")
+    for shape, make in (("mixed", make_paragraph), ("link list", make_link_list)):
+        for links in sizes:
+            number = max(1, 2000 // links)
+            chars, chained, single = bench(make(links), number)
+            print(f"{shape:>10} {links:>6} {chars:>8} {chained * 1000:>11.3f} {single * 1000:>10.3f} {chained / single:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
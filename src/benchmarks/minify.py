@@ -0,0 +1,53 @@
+# Bytes saved by --minify on the synthetic corpus, raw and after gzip, and
+# what minification costs in render throughput.
+# Run from src/: python3 -m benchmarks.minify [pages]
+import sys
+import time
+
+from benchmarks.corpus import TEMPLATE, CorpusGenerator
+from compress import gzip_bytes
+from helper import Template, extract_title, markdown_to_html_node
+
+
+def render(documents: list, minify: bool) -> tuple:
+    # Returns (rendered pages, seconds)
+    template = Template(TEMPLATE, "/", minify)
+    start = time.perf_counter()
+    pages = []
+    for document in documents:
+        content = markdown_to_html_node(document, minify=minify).iter_html("/", minify)
+        pages.append(template.render(Title=extract_title(document), Content=content))
+    return pages, time.perf_counter() - start
+
+
+def run(pages: int = 500) -> dict:
+    generator = CorpusGenerator(seed=5)
+    documents = [generator.page(i) for i in range(pages)]
+    results = {}
+    for minify in (False, True):
+        rendered, seconds = render(documents, minify)
+        data = [page.encode("utf-8") for page in rendered]
+        results[minify] = {
+            "bytes": sum(len(page) for page in data),
+            "gzip": sum(len(gzip_bytes(page)) for page in data),
+            "pages_per_sec": pages / seconds,
+        }
+    return results
+
+
+def main(argv: list = None):
+    argv = argv if argv is not None else sys.argv[1:]
+    pages = int(argv[0]) if argv else 500
+    results = run(pages)
+    plain, minified = results[False], results[True]
+    print(f"{pages} pages")
+    print(f"{'':<10} {'bytes':>12} {'gzip bytes':>12} {'pages/s':>10}")
+    for name, result in (("plain", plain), ("minified", minified)):
+        print(f"{name:<10} {result['bytes']:>12} {result['gzip']:>12} {result['pages_per_sec']:>10.0f}")
+    for key, label in (("bytes", "raw"), ("gzip", "gzip")):
+        saved = plain[key] - minified[key]
+        print(f"saved ({label}): {saved} bytes ({saved / plain[key]:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Memory and construction cost of the slotted node classes compared with
+# equivalent __dict__-based classes. Run from src/: python3 -m benchmarks.nodes
+import sys
+import timeit
+import tracemalloc
+
+from htmlnode import LeafNode
+from textnode import TextNode, TextType
+
+
+class DictTextNode():
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = TextType(text_type)
+        self.url = url
+
+
+class DictHTMLNode():
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+class DictLeafNode(DictHTMLNode):
+    def __init__(self, tag, value, props=None):
+        super().__init__(tag, value, None, props)
+
+
+def make_corpus(count: int) -> list:
+    types = [TextType.TEXT, TextType.BOLD, TextType.ITALIC, TextType.CODE, TextType.LINK]
+    return [(f"word {i}", types[i % len(types)], f"/page/{i}" if i % 5 == 4 else None) for i in range(count)]
+
+
+def bytes_per_node(factory, corpus: list) -> float:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    nodes = [factory(*args) for args in corpus]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    total = sum(stat.size_diff for stat in stats)
+    # Subtract the list holding the nodes
+    total -= sys.getsizeof(nodes)
+    return total / len(nodes)
+
+
+def construct_time(factory, corpus: list) -> float:
+    return min(timeit.repeat(lambda: [factory(*args) for args in corpus], number=1, repeat=5))
+
+
+def main(argv: list = None):
+    argv = argv if argv is not None else sys.argv[1:]
+    count = int(argv[0]) if argv else 200_000
+    corpus = make_corpus(count)
+    leaf_corpus = [("b", text, {"href": url} if url else None) for text, _, url in corpus]
+    rows = [
+        ("TextNode", DictTextNode, TextNode, corpus),
+        ("LeafNode", DictLeafNode, LeafNode, leaf_corpus),
+    ]
+    print(f"{count} nodes per class")
+    print(f"{'class':>9} {'dict B/node':>12} {'slots B/node':>13} {'dict ms':>8} {'slots ms':>9} {'speedup':>8}")
+    for name, legacy, slotted, args in rows:
+        legacy_bytes = bytes_per_node(legacy, args)
+        slotted_bytes = bytes_per_node(slotted, args)
+        legacy_time = construct_time(legacy, args)
+        slotted_time = construct_time(slotted, args)
+        print(f"{name:>9} {legacy_bytes:>12.1f} {slotted_bytes:>13.1f} {legacy_time * 1000:>8.1f} "
+              f"{slotted_time * 1000:>9.1f} {legacy_time / slotted_time:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# Builds a synthetic corpus and reports throughput, peak RSS and per-stage timings,
+# optionally comparing against a saved baseline.
+# Run from src/: python3 -m benchmarks.runner --pages 10000 --baseline bench.json
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import add_corpus_arguments, generator_from_args
+from main import generate_pages_recursive
+from profiling import BuildProfiler
+
+
+def peak_rss_kb() -> int:
+    try:
+        import resource
+    except ImportError:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def timed_build(content_dir: str, template_path: str, dest_dir: str, jobs: int = 1, profiler: BuildProfiler = None) -> float:
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if profiler is None:
+            generate_pages_recursive("/", content_dir, template_path, dest_dir, jobs=jobs)
+        else:
+            with profiler:
+                generate_pages_recursive("/", content_dir, template_path, dest_dir)
+    return time.perf_counter() - start
+
+
+def run(args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = args.corpus or tmp
+        content_dir = os.path.join(corpus_dir, "content")
+        if not os.path.isdir(content_dir):
+            generator_from_args(args).write(corpus_dir, args.pages)
+        template_path = os.path.join(corpus_dir, "template.html")
+        wall = timed_build(content_dir, template_path, os.path.join(tmp, "docs"), args.jobs)
+        result = {
+            "pages": args.pages,
+            "seed": args.seed,
+            "jobs": args.jobs,
+            "wall": wall,
+            "pages_per_sec": args.pages / wall,
+            "peak_rss_kb": peak_rss_kb(),
+            "stages": {},
+        }
+        if not args.no_profile:
+            profiler = BuildProfiler()
+            timed_build(content_dir, template_path, os.path.join(tmp, "docs-profiled"), profiler=profiler)
+            result["stages"] = {name: wall for name, (_, wall, _) in profiler.stages.items()}
+    return result
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    # Returns human-readable regressions beyond the tolerance (a fraction, e.g. 0.1)
+    regressions = []
+    if result["pages_per_sec"] < baseline["pages_per_sec"] * (1 - tolerance):
+        regressions.append(
+            f"pages/sec {result['pages_per_sec']:.1f} < baseline {baseline['pages_per_sec']:.1f}"
+        )
+    for name, wall in result.get("stages", {}).items():
+        base = baseline.get("stages", {}).get(name)
+        if base and wall > base * (1 + tolerance):
+            regressions.append(f"{name} {wall * 1000:.1f} ms > baseline {base * 1000:.1f} ms")
+    return regressions
+
+
+def report(result: dict, baseline: dict = None) -> str:
+    lines = [
+        f"pages:       {result['pages']} (seed {result['seed']}, jobs {result['jobs']})",
+        f"wall:        {result['wall']:.2f} s",
+        f"pages/sec:   {result['pages_per_sec']:.1f}" + _delta(result["pages_per_sec"], baseline and baseline["pages_per_sec"]),
+        f"peak RSS:    {result['peak_rss_kb'] / 1024:.1f} MiB",
+    ]
+    if result["stages"]:
+        lines.append("stages (profiled pass):")
+        base_stages = (baseline or {}).get("stages", {})
+        for name, wall in sorted(result["stages"].items(), key=lambda item: -item[1]):
+            lines.append(f"  {name:<20} {wall * 1000:>10.1f} ms" + _delta(wall, base_stages.get(name)))
+    return "\n".join(lines)
+
+
+def _delta(value: float, base: float) -> str:
+    if not base:
+        return ""
+    return f"  ({(value - base) / base:+.1%} vs baseline)"
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Benchmark the page pipeline on a synthetic corpus")
+    add_corpus_arguments(parser)
+    parser.add_argument("--corpus", help="reuse (or create) the corpus in this directory instead of a temp dir")
+    parser.add_argument("-j", "--jobs", type=int, default=1)
+    parser.add_argument("--no-profile", action="store_true", help="skip the profiled pass with per-stage timings")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save", help="write this run's results as JSON (e.g. a new baseline)")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before failing, as a fraction")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    result = run(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(report(result, baseline))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent=1, sort_keys=True)
+    if baseline is not None:
+        regressions = compare(result, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
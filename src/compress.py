@@ -0,0 +1,111 @@
+import gzip
+import io
+import os
+
+COMPRESSIBLE = frozenset((".html", ".css", ".js", ".mjs", ".json", ".svg", ".txt", ".xml", ".map"))
+# Below this many bytes the saving is smaller than the per-file overhead of serving a variant
+DEFAULT_MIN_SIZE = 1024
+
+# Optional; looked up on first use so builds without --precompress never import it
+_brotli = None
+_brotli_checked = False
+
+
+def brotli_module():
+    # The brotli module, or None when it is not installed
+    global _brotli, _brotli_checked
+    if not _brotli_checked:
+        try:
+            import brotli
+        except ImportError:
+            brotli = None
+        _brotli, _brotli_checked = brotli, True
+    return _brotli
+
+
+def encodings() -> list:
+    return [".gz", ".br"] if brotli_module() is not None else [".gz"]
+
+
+def gzip_bytes(data: bytes) -> bytes:
+    # mtime=0 and no file name keep the output byte-identical between builds
+    buffer = io.BytesIO()
+    with gzip.GzipFile(filename="", mode="wb", compresslevel=9, fileobj=buffer, mtime=0) as f:
+        f.write(data)
+    return buffer.getvalue()
+
+
+def compress_bytes(data: bytes, suffix: str) -> bytes:
+    if suffix == ".gz":
+        return gzip_bytes(data)
+    return brotli_module().compress(data, quality=11)
+
+
+def sibling_paths(path: str) -> list:
+    return [path + suffix for suffix in (".gz", ".br")]
+
+
+def remove_siblings(path: str) -> int:
+    removed = 0
+    for sibling in sibling_paths(path):
+        if os.path.lexists(sibling):
+            os.remove(sibling)
+            removed += 1
+    return removed
+
+
+def precompress_file(path: str, min_size: int = DEFAULT_MIN_SIZE) -> dict:
+    # Writes path.gz (and path.br) next to path. A sibling carries the mtime of
+    # the file it was made from, so an unchanged output (whose mtime the build
+    # preserves) is detected with a stat. Variants that would not be smaller
+    # than the original are not kept.
+    stats = {"compressed": 0, "unchanged": 0, "skipped": 0, "removed": 0}
+    if brotli_module() is None and os.path.lexists(path + ".br"):
+        # Left over from a build that had brotli; it would go stale
+        os.remove(path + ".br")
+        stats["removed"] += 1
+    stat = os.stat(path)
+    if stat.st_size < min_size:
+        stats["removed"] += remove_siblings(path)
+        stats["skipped"] += 1
+        return stats
+    data = None
+    for suffix in encodings():
+        sibling = path + suffix
+        try:
+            if os.stat(sibling).st_mtime_ns == stat.st_mtime_ns:
+                stats["unchanged"] += 1
+                continue
+        except FileNotFoundError:
+            pass
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        compressed = compress_bytes(data, suffix)
+        if len(compressed) >= len(data):
+            if os.path.lexists(sibling):
+                os.remove(sibling)
+                stats["removed"] += 1
+            stats["skipped"] += 1
+            continue
+        tmp_path = sibling + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_path, sibling)
+        stats["compressed"] += 1
+    return stats
+
+
+def precompress(paths, min_size: int = DEFAULT_MIN_SIZE, jobs: int = None) -> tuple:
+    # Compresses the text outputs among paths in parallel (zlib and brotli
+    # release the GIL); returns (stats, siblings that now exist)
+    paths = sorted(path for path in paths if os.path.splitext(path)[1].lower() in COMPRESSIBLE and os.path.isfile(path))
+    totals = {"compressed": 0, "unchanged": 0, "skipped": 0, "removed": 0}
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as executor:
+        for stats in executor.map(lambda path: precompress_file(path, min_size), paths):
+            for key, count in stats.items():
+                totals[key] += count
+    siblings = [sibling for path in paths for sibling in sibling_paths(path) if os.path.exists(sibling)]
+    return totals, siblings
@@ -0,0 +1,213 @@
+import json
+import os
+import socket
+import sys
+import time
+
+# Kept light on purpose: running this file is the client, and its startup is
+# the whole cost of a build request. The generator itself is only imported
+# by the daemon.
+DEFAULT_SOCKET_PATH = "./.cache/build.sock"
+# How long a client waits for a daemon that is restarting after a code change
+RESTART_TIMEOUT = 10.0
+
+
+def source_stamp() -> dict:
+    # mtimes of the generator's own modules; the daemon restarts when one changes
+    directory = os.path.dirname(os.path.abspath(__file__))
+    return {entry.name: entry.stat().st_mtime_ns for entry in os.scandir(directory) if entry.name.endswith(".py")}
+
+
+class BuildDaemon():
+    # Runs builds requested over a Unix socket in one long-lived process, so
+    # the interpreter, imported modules, compiled templates, inline memo and
+    # open render caches stay warm between builds. Requests are served one at
+    # a time; each is a JSON line {"argv": [...], "cwd": ...} answered with
+    # {"status": exit status, "output": everything the build printed}.
+    def __init__(self, socket_path: str = None):
+        self.socket_path = socket_path or DEFAULT_SOCKET_PATH
+        self.stamp = source_stamp()
+        self.caches = {}
+        self.listener = None
+
+    def render_cache(self, args):
+        if not args.render_cache:
+            return None
+        key = (os.path.abspath(args.render_cache), args.render_cache_size)
+        if key not in self.caches:
+            from render_cache import RenderCache
+            self.caches[key] = RenderCache(args.render_cache, args.render_cache_size * 1024 * 1024)
+        return self.caches[key]
+
+    def run(self, argv: list) -> tuple:
+        # One build, exactly as main.py would run it; returns (status, output)
+        import contextlib
+        import io
+        import traceback
+        import main
+
+        output = io.StringIO()
+        status = 0
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            try:
+                if argv[:1] in (["serve"], ["daemon"]):
+                    print(f"'{argv[0]}' cannot run inside the build daemon", file=sys.stderr)
+                    status = 2
+                elif argv[:1] == ["merge"]:
+                    main.main(argv)
+                else:
+                    args = main.parse_args(argv)
+                    if args.profile:
+                        main.main(argv)
+                    else:
+                        main.build(args, self.render_cache(args))
+            except SystemExit as e:
+                if isinstance(e.code, str):
+                    print(e.code, file=sys.stderr)
+                    status = 1
+                else:
+                    status = e.code or 0
+            except Exception:
+                traceback.print_exc()
+                status = 1
+        return status, output.getvalue()
+
+    def handle(self, connection) -> bool:
+        # Answers one request; False when the daemon should stop accepting
+        with connection, connection.makefile("rb") as reader:
+            line = reader.readline()
+            if not line:
+                return True
+            message = json.loads(line)
+            if message.get("ping"):
+                self.reply(connection, {"status": 0, "output": ""})
+                return True
+            if message.get("stop"):
+                self.reply(connection, {"status": 0, "output": "Build daemon stopped\n"})
+                return False
+            if source_stamp() != self.stamp:
+                # Modules cannot be reloaded safely; the client reconnects to the new process
+                self.reply(connection, {"restart": True})
+                self.restart()
+            if os.path.realpath(message.get("cwd", "")) != os.path.realpath(os.getcwd()):
+                self.reply(connection, {"status": 2, "output": f"The build daemon serves {os.getcwd()}\n"})
+                return True
+            started = time.perf_counter()
+            status, output = self.run(message.get("argv", []))
+            self.reply(connection, {"status": status, "output": output})
+            print(f"Build {' '.join(message.get('argv', [])) or '(defaults)'}: exit {status} in {(time.perf_counter() - started) * 1000:.0f} ms", flush=True)
+        return True
+
+    def reply(self, connection, message: dict):
+        try:
+            connection.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        except OSError:
+            # The client gave up; the build itself still counts
+            pass
+
+    def serve(self):
+        directory = os.path.dirname(self.socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            try:
+                request({"ping": True}, self.socket_path)
+            except OSError:
+                # Left behind by a daemon that did not shut down cleanly
+                os.remove(self.socket_path)
+            else:
+                raise RuntimeError(f"A build daemon is already listening on {self.socket_path}")
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        self.listener.listen()
+        print(f"Build daemon listening on {self.socket_path}", flush=True)
+        try:
+            while True:
+                connection, _ = self.listener.accept()
+                if not self.handle(connection):
+                    break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        for cache in self.caches.values():
+            cache.close()
+        self.caches = {}
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def restart(self):
+        print("Generator sources changed; restarting the build daemon", flush=True)
+        self.close()
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+
+def request(message: dict, socket_path: str = None) -> dict:
+    # Sends one message and waits for the reply; raises OSError if no daemon is listening
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path or DEFAULT_SOCKET_PATH)
+        client.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with client.makefile("rb") as reader:
+            line = reader.readline()
+    if not line:
+        raise ConnectionResetError("the build daemon closed the connection")
+    return json.loads(line)
+
+
+def build(argv: list, socket_path: str = None) -> int:
+    # Runs a build in the daemon and prints its output; without a daemon the
+    # build runs in this process instead
+    message = {"argv": argv, "cwd": os.getcwd()}
+    deadline = None
+    while True:
+        try:
+            reply = request(message, socket_path)
+        except OSError:
+            if deadline is None or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+            continue
+        if not reply.get("restart"):
+            sys.stdout.write(reply["output"])
+            return reply["status"]
+        deadline = time.monotonic() + RESTART_TIMEOUT
+    print(f"No build daemon on {socket_path or DEFAULT_SOCKET_PATH} (start one with 'main.py daemon'); building in this process", file=sys.stderr)
+    import main
+    try:
+        main.main(argv)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+    return 0
+
+
+def parse_args(argv: list):
+    import argparse
+    parser = argparse.ArgumentParser(prog="main.py daemon", description="Keep a build process running and serve build requests on a Unix socket")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, metavar="PATH", help="socket the daemon listens on")
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None):
+    # Client: daemon.py [--socket PATH] [--stop | main.py build arguments]
+    argv = sys.argv[1:] if argv is None else argv
+    socket_path = None
+    if argv[:1] == ["--socket"]:
+        socket_path, argv = argv[1], argv[2:]
+    if argv == ["--stop"]:
+        try:
+            sys.stdout.write(request({"stop": True}, socket_path)["output"])
+        except OSError:
+            print(f"No build daemon on {socket_path or DEFAULT_SOCKET_PATH}", file=sys.stderr)
+            return 1
+        return 0
+    return build(argv, socket_path)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
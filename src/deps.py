@@ -0,0 +1,87 @@
+import json
+import os
+import posixpath
+from urllib.parse import unquote, urlsplit
+
+from fileio import save_json
+
+DEPS_VERSION = 1
+DEFAULT_DEPS_PATH = "./.cache/deps.json"
+
+
+def normalize(path: str) -> str:
+    return os.path.normpath(path)
+
+
+def reference_to_path(url: str, dest_dir: str) -> str:
+    # Maps a root-relative URL to the output file it loads, or None for links
+    # to other pages (those do not affect how this page renders).
+    parts = urlsplit(url)
+    path = unquote(parts.path)
+    if parts.scheme or parts.netloc or not path.startswith("/"):
+        return None
+    if path.endswith("/") or path.endswith(".html") or not posixpath.splitext(path)[1]:
+        return None
+    return normalize(os.path.join(dest_dir, path.lstrip("/")))
+
+
+class DependencyGraph():
+    # nodes: output path -> {"kind": "page" | "static", "inputs": [paths]}
+    # For pages the first two inputs are the markdown source and the template.
+    def __init__(self, path: str = None):
+        self.path = path or DEFAULT_DEPS_PATH
+        self.basepath = None
+        # Output-affecting build settings (--minify, --fingerprint)
+        self.options = {}
+        self.nodes = {}
+
+    @classmethod
+    def load(cls, path: str = None):
+        graph = cls(path)
+        try:
+            with open(graph.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return graph
+        if data.get("version") != DEPS_VERSION:
+            return graph
+        graph.basepath = data.get("basepath")
+        graph.options = data.get("options", {})
+        graph.nodes = data.get("nodes", {})
+        return graph
+
+    def save(self):
+        save_json(self.path, {"version": DEPS_VERSION, "basepath": self.basepath, "options": self.options, "nodes": self.nodes})
+
+    def record_page(self, dest_path: str, from_path: str, template_path: str, references, dest_dir: str):
+        inputs = [normalize(from_path), normalize(template_path)]
+        assets = {reference_to_path(url, dest_dir) for url in references}
+        inputs.extend(sorted(asset for asset in assets if asset is not None))
+        self.nodes[normalize(dest_path)] = {"kind": "page", "inputs": inputs}
+
+    def record_static(self, dest_path: str, source_path: str):
+        self.nodes[normalize(dest_path)] = {"kind": "static", "inputs": [normalize(source_path)]}
+
+    def remove(self, dest_path: str):
+        self.nodes.pop(normalize(dest_path), None)
+
+    def dependents(self) -> dict:
+        reverse = {}
+        for output, node in self.nodes.items():
+            for path in node["inputs"]:
+                reverse.setdefault(path, set()).add(output)
+        return reverse
+
+    def affected(self, changed: list) -> list:
+        # Every output reachable from the changed paths, including outputs that
+        # depend on other affected outputs (page -> copied asset -> source asset)
+        reverse = self.dependents()
+        seen = set()
+        frontier = [normalize(path) for path in changed]
+        while frontier:
+            path = frontier.pop()
+            for output in reverse.get(path, ()):
+                if output not in seen:
+                    seen.add(output)
+                    frontier.append(output)
+        return sorted(seen)
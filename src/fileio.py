@@ -0,0 +1,179 @@
+import hashlib
+import os
+import threading
+
+DEFAULT_IN_FLIGHT = 8
+
+# Build-wide counts of output files, by outcome
+_output_stats = {"written": 0, "unchanged": 0, "removed": 0}
+_stats_lock = threading.Lock()
+
+
+def record_output(outcome: str, count: int = 1):
+    with _stats_lock:
+        _output_stats[outcome] += count
+
+
+def output_stats() -> dict:
+    with _stats_lock:
+        return dict(_output_stats)
+
+
+def reset_output_stats():
+    with _stats_lock:
+        for outcome in _output_stats:
+            _output_stats[outcome] = 0
+
+
+def file_digest(path: str) -> str:
+    # sha256 hex; also what fingerprints, image variant names and shard
+    # manifests are made of, so it must not change
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def same_contents(path: str, data: bytes) -> bool:
+    # Size first: most changed pages are caught by a stat without reading the file
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+        return file_digest(path) == hashlib.sha256(data).hexdigest()
+    except FileNotFoundError:
+        return False
+
+
+def atomic_write(path: str, chunks) -> bool:
+    # Writes to a temp file next to path and renames it over the target, so
+    # readers (and a crashed build) only ever see the old or the new file.
+    # Content identical to the existing file is not written, which keeps its
+    # mtime; returns whether the file was written.
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        if isinstance(chunks, str):
+            data = chunks.encode("utf-8")
+            if same_contents(path, data):
+                record_output("unchanged")
+                return False
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+        else:
+            # Too large to hold in memory: write it out, then compare the files
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(chunks)
+            if _same_file(tmp_path, path):
+                os.remove(tmp_path)
+                record_output("unchanged")
+                return False
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    record_output("written")
+    return True
+
+
+def save_json(path: str, data):
+    # Build state (manifests, caches) rather than site output: replaced
+    # atomically, but not counted in the output stats
+    import json
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def remove_empty_parents(directory: str, stop_dir: str):
+    # Removes directory and then its parents while they are empty, up to but
+    # not including stop_dir
+    stop_dir = os.path.abspath(stop_dir)
+    directory = os.path.abspath(directory)
+    while directory != stop_dir and directory.startswith(stop_dir + os.sep):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
+
+
+def _same_file(new_path: str, path: str) -> bool:
+    try:
+        if os.path.getsize(new_path) != os.path.getsize(path):
+            return False
+    except FileNotFoundError:
+        return False
+    return file_digest(new_path) == file_digest(path)
+
+
+def read_source(path: str, max_size: int = None) -> str:
+    # Returns None for files at or above max_size; callers stream those instead
+    if max_size is not None and os.path.getsize(path) >= max_size:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class FileIO():
+    # Overlaps source reads and output writes with rendering. Reads for the
+    # paths given to prefetch() are issued ahead of use and writes are queued;
+    # at most in_flight of each are outstanding at once, so memory stays bounded
+    # when the disk is slower than the renderer. close() waits for every write
+    # and raises the first error.
+    def __init__(self, in_flight: int = DEFAULT_IN_FLIGHT, max_size: int = None):
+        self.in_flight = max(1, in_flight)
+        self.max_size = max_size
+        from concurrent.futures import ThreadPoolExecutor
+        self._pool = ThreadPoolExecutor(max_workers=self.in_flight * 2, thread_name_prefix="fileio")
+        self._queue = []
+        self._reads = {}
+        self._write_slots = threading.BoundedSemaphore(self.in_flight)
+        self._errors = []
+
+    def prefetch(self, paths):
+        self._queue = list(paths)
+        self._queue.reverse()
+        self._fill()
+
+    def _fill(self):
+        while self._queue and len(self._reads) < self.in_flight:
+            path = self._queue.pop()
+            self._reads[path] = self._pool.submit(read_source, path, self.max_size)
+
+    def read(self, path: str) -> str:
+        future = self._reads.pop(path, None)
+        self._fill()
+        if future is None:
+            return read_source(path, self.max_size)
+        return future.result()
+
+    def write(self, path: str, content: str):
+        self._write_slots.acquire()
+        future = self._pool.submit(atomic_write, path, content)
+        future.add_done_callback(self._written)
+
+    def _written(self, future):
+        self._write_slots.release()
+        if future.exception() is not None:
+            self._errors.append(future.exception())
+
+    def close(self):
+        self._queue = []
+        self._pool.shutdown(wait=True)
+        self._reads = {}
+        if self._errors:
+            raise self._errors[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._pool.shutdown(wait=True)
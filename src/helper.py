@@ -1,5 +1,12 @@
 from textnode import TextNode, TextType, BlockType
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLFragment, HTMLNode, LeafNode, ParentNode
+import os
+import re
+
+import profiling
+from fileio import atomic_write, read_source
+from images import catalog_digest, image_attributes
+from minify import minify_html
 
 def split_nodes_delimiter(old_nodes :list, delimiter: str, text_type: TextType):
 
@@ -22,15 +29,27 @@ def split_nodes_delimiter(old_nodes :list, delimiter: str, text_type: TextType):
         new_nodes.extend(split_nodes)
     return new_nodes
 
+IMAGE_PATTERN = re.compile(r"!\[(.*?)\]\((.*?)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[(.*?)\]\((.*?)\)")
+HEADING_PATTERN = re.compile(r"#{1,6} .+")
+# Quoted, or unquoted as written by a minified build
+REFERENCE_PATTERN = re.compile(r'(?:href|src)=(?:"(/[^"]*)"|(/[^\s"\'=<>`]*))')
+# First characters of an ordered list block
+DIGITS = frozenset("123456789")
+# A fence still open after this many lines is given up on at the next blank
+# line, so an unclosed fence in a streamed source cannot buffer the rest of it
+MAX_FENCE_LINES = 10000
+
 def extract_markdown_images(text: str) -> list:
-    import re
-    matches = re.findall(r"!\[(.*?)\]\((.*?)\)", text)
-    return matches
+    # Plain prose has no "![", so skip the regex engine entirely
+    if "![" not in text:
+        return []
+    return IMAGE_PATTERN.findall(text)
 
 def extract_markdown_links(text: str) -> list:
-    import re
-    matches = re.findall(r"(?<!!)\[(.*?)\]\((.*?)\)", text)
-    return matches
+    if "[" not in text:
+        return []
+    return LINK_PATTERN.findall(text)
 
 def split_nodes_image(old_nodes: list) -> list:
     new_nodes = []
@@ -76,54 +95,194 @@ def split_nodes_link(old_nodes: list) -> list:
             new_nodes.append(TextNode(node.text, TextType.TEXT))
     return new_nodes
 
+INLINE_DELIMITERS = (
+    ("**", TextType.BOLD),
+    ("_", TextType.ITALIC),
+    ("`", TextType.CODE),
+)
+
 def text_to_textnodes(text: str) -> list:
-    nodes = [TextNode(text, TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    # Produces the same nodes as chaining split_nodes_delimiter for each of
+    # INLINE_DELIMITERS followed by split_nodes_image and split_nodes_link,
+    # but builds every TextNode once instead of rebuilding the list per pass.
+    nodes = []
+    _tokenize_inline(text, 0, nodes)
     return nodes
 
-def markdown_to_blocks(markdown: str) -> list:
-    blocks = markdown.split("\n\n")
-    filtered_blocks = []
-    for block in blocks:
-        block = block.strip()
-        if block == "":
+def _tokenize_inline(text: str, level: int, nodes: list):
+    if level == len(INLINE_DELIMITERS):
+        _tokenize_images(text, nodes)
+        return
+    delimiter, text_type = INLINE_DELIMITERS[level]
+    if delimiter not in text:
+        _tokenize_inline(text, level + 1, nodes)
+        return
+    sections = text.split(delimiter)
+    if len(sections) % 2 == 0:
+        raise ValueError("Invalid markdown, formatted section not closed")
+    for i, section in enumerate(sections):
+        if section == "":
             continue
-        filtered_blocks.append(block)
-    return filtered_blocks
+        if i % 2 == 0:
+            _tokenize_inline(section, level + 1, nodes)
+        else:
+            nodes.append(TextNode(section, text_type))
+
+def _tokenize_images(text: str, nodes: list):
+    if "[" not in text:
+        if text != "":
+            nodes.append(TextNode(text, TextType.TEXT))
+        return
+    if "![" not in text:
+        _tokenize_links(text, nodes)
+        return
+    start = 0
+    for match in IMAGE_PATTERN.finditer(text):
+        _tokenize_links(text[start:match.start()], nodes)
+        nodes.append(TextNode(match.group(1), TextType.IMAGE, match.group(2)))
+        start = match.end()
+    _tokenize_links(text[start:] if start else text, nodes)
+
+def _tokenize_links(text: str, nodes: list):
+    if text == "":
+        return
+    start = 0
+    for match in LINK_PATTERN.finditer(text):
+        if match.start() > start:
+            nodes.append(TextNode(text[start:match.start()], TextType.TEXT))
+        nodes.append(TextNode(match.group(1), TextType.LINK, match.group(2)))
+        start = match.end()
+    if start < len(text):
+        nodes.append(TextNode(text[start:], TextType.TEXT))
+
+def markdown_to_blocks(markdown: str) -> list:
+    return [block for block, _ in markdown_to_typed_blocks(markdown)]
+
+def markdown_to_typed_blocks(markdown: str) -> list:
+    return list(scan_blocks(markdown.split("\n")))
 
 def is_md_heading(block: str) -> bool:
-    import re
-    if re.match(r"^#{1,6} .+", block):
-        return True
-    return False
+    if not block.startswith("#"):
+        return False
+    return HEADING_PATTERN.match(block) is not None
 
 def block_to_block_type(markdown: str) -> BlockType:
-    if is_md_heading(markdown):
-        return BlockType.HEADING
-    if markdown.startswith("```") and markdown.endswith("```"):
-        return BlockType.CODE
-    if markdown.startswith("> "):
-        return BlockType.QUOTE
-    if markdown.startswith("- ") or markdown.startswith("* "):
-        return BlockType.UNORDERED_LIST
-    if any(markdown.startswith(f"{i}. ") for i in range(1, 10)):
-        return BlockType.ORDERED_LIST
+    # Every type is decided by the first few characters, except code, which
+    # must also end with a fence
+    first = markdown[:1]
+    if first == "#":
+        level = len(markdown) - len(markdown.lstrip("#"))
+        if level <= 6 and markdown[level:level + 1] == " " and markdown[level + 1:level + 2] not in ("", "\n"):
+            return BlockType.HEADING
+    elif first == "`":
+        if markdown.startswith("```") and markdown.endswith("```"):
+            return BlockType.CODE
+    elif first == ">":
+        if markdown[1:2] == " ":
+            return BlockType.QUOTE
+    elif first == "-" or first == "*":
+        if markdown[1:2] == " ":
+            return BlockType.UNORDERED_LIST
+    elif first in DIGITS:
+        if markdown[1:3] == ". ":
+            return BlockType.ORDERED_LIST
     return BlockType.PARAGRAPH
 
-def markdown_to_html_node(markdown: str) -> HTMLNode:
-    blocks = markdown_to_blocks(markdown)
+def scan_blocks(lines) -> iter:
+    # Single pass over any iterable of lines (a list, an open file), yielding
+    # (block, block_type) and holding only the current block in memory. Blocks
+    # are separated by blank or whitespace-only lines; "\r\n" endings are
+    # accepted. A block that opens with a ``` fence runs to the closing fence,
+    # blank lines included. If the fence is never closed, or is still open
+    # after MAX_FENCE_LINES lines, the buffered lines are split as ordinary
+    # blocks instead of swallowing the rest of the file.
+    block = []
+    in_fence = False
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if in_fence:
+            if len(block) >= MAX_FENCE_LINES and (line.isspace() or line == ""):
+                in_fence = False
+                yield from _split_unclosed_fence(block)
+                block = []
+                continue
+            block.append(line)
+            if line.rstrip().endswith("```"):
+                in_fence = False
+                yield _finish_block(block)
+                block = []
+            continue
+        if line.isspace() or line == "":
+            if block:
+                text, block_type = _finish_block(block)
+                if text != "":
+                    yield text, block_type
+                block = []
+            continue
+        if not block and line.lstrip().startswith("```"):
+            stripped = line.strip()
+            in_fence = len(stripped) < 6 or not stripped.endswith("```")
+        block.append(line)
+    if in_fence:
+        yield from _split_unclosed_fence(block)
+    elif block:
+        yield _finish_block(block)
+
+def _finish_block(block: list) -> tuple:
+    text = "\n".join(block).strip()
+    return text, block_to_block_type(text)
+
+def _split_unclosed_fence(block: list) -> iter:
+    start = 0
+    for i, line in enumerate(block + [""]):
+        if line.isspace() or line == "":
+            if i > start:
+                yield _finish_block(block[start:i])
+            start = i + 1
+
+def iter_markdown_blocks(lines) -> iter:
+    # Streaming counterpart of markdown_to_blocks
+    for block, _ in scan_blocks(lines):
+        yield block
+
+def render_block(block: str, cache=None, basepath: str = "/", block_type: BlockType = None, minify: bool = False, assets=None) -> HTMLNode:
+    if cache is None:
+        return block_to_html_node(block, block_type)
+    # Cached blocks are spliced in as pre-rendered HTML, which already has the
+    # basepath, minification, asset fingerprints and image attributes applied,
+    # so other settings get their own entries (any asset or image change
+    # invalidates the entries made with the previous ones)
+    key = block if basepath == "/" else f"{basepath}\0{block}"
+    if minify:
+        key = f"minify\0{key}"
+    if assets is not None:
+        key = f"{assets.digest}\0{key}"
+    images = catalog_digest()
+    if images is not None:
+        key = f"images:{images}\0{key}"
+    html = cache.get(key)
+    if html is None:
+        html = block_to_html_node(block, block_type).to_html(basepath, minify, assets)
+        cache.put(key, html)
+    return HTMLFragment(html)
+
+def markdown_to_html_node(markdown: str, cache=None, basepath: str = "/", minify: bool = False, assets=None) -> HTMLNode:
+    blocks = markdown_to_typed_blocks(markdown)
     children = []
-    for block in blocks:
-        html_node = block_to_html_node(block)
-        children.append(html_node)
+    for block, block_type in blocks:
+        children.append(render_block(block, cache, basepath, block_type, minify, assets))
     return ParentNode("div", children, None)
 
-def block_to_html_node(block: str) -> HTMLNode:
-    block_type = block_to_block_type(block)
+def iter_markdown_html(lines, cache=None, basepath: str = "/", minify: bool = False, assets=None):
+    # Yields the same chunks as markdown_to_html_node(...).iter_html(basepath, minify, assets), one block at a time
+    yield "<div>"
+    for block, block_type in scan_blocks(lines):
+        yield from render_block(block, cache, basepath, block_type, minify, assets).iter_html(basepath, minify, assets)
+    yield "</div>"
+
+def block_to_html_node(block: str, block_type: BlockType = None) -> HTMLNode:
+    if block_type is None:
+        block_type = block_to_block_type(block)
     if block_type == BlockType.PARAGRAPH:
         return paragraph_to_html_node(block)
     if block_type == BlockType.HEADING:
@@ -138,12 +297,76 @@ def block_to_html_node(block: str) -> HTMLNode:
         return olist_to_html_node(block)
     raise ValueError("Invalid block type")
 
+class InlineMemo():
+    # Bounded LRU of inline text -> rendered leaf nodes. Nodes are shared between
+    # the pages that reuse a fragment, which is safe because rendering never
+    # mutates them (the basepath is applied when they are serialized).
+    # Long texts are not memoized: they are rarely repeated and would crowd out
+    # the short fragments (nav items, footers, list entries) that are. A text is
+    # only stored the second time it is seen; keeping nodes for one-off text
+    # costs more in allocation and GC traversal than the memo saves.
+    def __init__(self, max_entries: int = 4096, max_text: int = 256):
+        from collections import OrderedDict
+        self.max_entries = max_entries
+        self.max_text = max_text
+        self.entries = OrderedDict()
+        self.seen = set()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str) -> tuple:
+        nodes = self.entries.get(text)
+        if nodes is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(text)
+        return nodes
+
+    def put(self, text: str, nodes: tuple):
+        if text not in self.seen:
+            if len(self.seen) >= self.max_entries * 4:
+                self.seen.clear()
+            self.seen.add(text)
+            return
+        self.entries[text] = nodes
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.seen.clear()
+        self.hits = 0
+        self.misses = 0
+
+inline_memo = InlineMemo()
+
+def configure_inline_memo(max_entries: int):
+    # 0 disables memoization
+    inline_memo.max_entries = max_entries
+    while len(inline_memo.entries) > max(max_entries, 0):
+        inline_memo.entries.popitem(last=False)
+    if max_entries <= 0:
+        inline_memo.seen.clear()
+
 def text_to_children(text: str) -> list:
+    memoize = inline_memo.max_entries > 0 and len(text) <= inline_memo.max_text
+    if memoize:
+        nodes = inline_memo.get(text)
+        if nodes is not None:
+            return list(nodes)
     text_nodes = text_to_textnodes(text)
     children = []
     for text_node in text_nodes:
         html_node = text_node.to_html_node()
+        if text_node.text_type == TextType.IMAGE:
+            # Size, srcset and lazy loading when a responsive image build configured them
+            extra = image_attributes(text_node.url)
+            if extra:
+                html_node.props.update(extra)
         children.append(html_node)
+    if memoize:
+        inline_memo.put(text, tuple(children))
     return children
 
 def paragraph_to_html_node(block: str) -> HTMLNode:
@@ -203,30 +426,145 @@ def olist_to_html_node(block: str) -> HTMLNode:
     return ParentNode("ol", html_items)
 
 def extract_title(markdown: str) -> str:
-    lines = markdown.split("\n")
+    return extract_title_from_lines(markdown.split("\n"))
+
+def extract_title_from_lines(lines) -> str:
     for line in lines:
         if line.startswith("# "):
             return line[2:].strip()
     raise Exception("No title found")
 
-def generate_page(basepath, from_path, template_path, dest_path):
+def rewrite_asset_urls(html: str, assets) -> str:
+    # Template counterpart of the assets argument of HTMLNode.to_html: points
+    # root-relative href/src URLs at fingerprinted copies
+    def replace(match):
+        group = 1 if match.group(1) is not None else 2
+        start, end = match.start(group) - match.start(), match.end(group) - match.start()
+        text = match.group(0)
+        return text[:start] + assets.resolve(match.group(group)) + text[end:]
+    return REFERENCE_PATTERN.sub(replace, html)
+
+def rewrite_basepath(html: str, basepath: str) -> str:
+    # Only used on the template, once per build; page content gets the basepath
+    # from HTMLNode.props_to_html as it is serialized
+    if basepath == "/":
+        return html
+    html = html.replace("href=\"/", f"href=\"{basepath}")
+    return html.replace("src=\"/", f"src=\"{basepath}")
+
+class Template():
+    # Splits the template into literal segments and {{ Name }} slots once, so
+    # rendering a page is a single join instead of a replace pass per placeholder.
+    def __init__(self, source: str, basepath: str = "/", minify: bool = False, assets=None):
+        self.basepath = basepath
+        html = source if assets is None else rewrite_asset_urls(source, assets)
+        html = rewrite_basepath(html, basepath)
+        if minify:
+            html = minify_html(html)
+        parts = re.split(r"\{\{ (\w+) \}\}", html)
+        # Root-relative URLs the template itself loads, before basepath rewriting
+        self.references = set(reference_urls(source))
+        self.segments = parts[0::2]
+        self.slots = parts[1::2]
+
+    def iter_chunks(self, **values):
+        # Slot values may be strings or iterables of string chunks
+        yield self.segments[0]
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            value = values.get(slot, f"{{{{ {slot} }}}}")
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value
+            yield segment
+
+    def render(self, **values) -> str:
+        return "".join(self.iter_chunks(**values))
+
+    def write(self, fp, **values):
+        fp.writelines(self.iter_chunks(**values))
+
+_template_cache = {}
+
+def load_template(path: str, basepath: str = "/", minify: bool = False, assets=None) -> Template:
+    # Compiled once per build; the stat check keeps the cache valid if the file changes
+    stat = os.stat(path)
+    key = (os.path.abspath(path), basepath, minify, assets)
+    cached = _template_cache.get(key)
+    if cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size):
+        return cached[1]
+    template = Template(read_file(path), basepath, minify, assets)
+    _template_cache[key] = ((stat.st_mtime_ns, stat.st_size), template)
+    return template
+
+# Sources at least this large are rendered block by block from disk
+STREAMING_THRESHOLD = 8 * 1024 * 1024
+
+def reference_urls(html: str) -> list:
+    return [quoted or unquoted for quoted, unquoted in REFERENCE_PATTERN.findall(html)]
+
+def collect_references(chunks, references: set, basepath: str = "/"):
+    # Passes chunks through, adding every root-relative href/src URL to references
+    # (with the basepath stripped again, so they name files under the output root)
+    for chunk in chunks:
+        if "=\"/" in chunk or "=/" in chunk:
+            for url in reference_urls(chunk):
+                if basepath != "/" and url.startswith(basepath):
+                    url = "/" + url[len(basepath):]
+                references.add(url)
+        yield chunk
+
+def generate_page(basepath, from_path, template_path, dest_path, cache=None, references: set = None, io=None, minify: bool = False, assets=None):
+    # If references is given, it receives the root-relative URLs the page links to.
+    # If io (a fileio.FileIO) is given, the source comes from its prefetched reads
+    # and the page is queued on its writer instead of written inline.
+    # If assets (an assets.AssetManifest) is given, links to assets use their fingerprinted names.
     print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    markdown = read_file(from_path)
-    template = read_file(template_path)
-    html = markdown_to_html_node(markdown).to_html()
-    title = extract_title(markdown)
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", html)
-    template = template.replace("href=\"/",f"href=\"{basepath}")
-    template = template.replace("src=\"/",f"src=\"{basepath}")
-    html = html.replace("href=\"/",f"href=\"{basepath}")
-    html = html.replace("src=\"/",f"src=\"{basepath}")
-    write_file(dest_path, template)
+    if os.path.getsize(from_path) >= STREAMING_THRESHOLD:
+        generate_page_streaming(basepath, from_path, template_path, dest_path, cache, references, minify, assets)
+        return
+    with profiling.page(from_path):
+        with profiling.stage("read"):
+            markdown = io.read(from_path) if io is not None else read_source(from_path)
+            template = load_template(template_path, basepath, minify, assets)
+        with profiling.stage("parse"):
+            node = markdown_to_html_node(markdown, cache, basepath, minify, assets)
+            title = extract_title(markdown)
+        content = node.iter_html(basepath, minify, assets)
+        if references is not None:
+            references.update(template.references)
+            content = collect_references(content, references, basepath)
+        if profiling.active():
+            # Serialize up front so to_html and the file write are timed separately
+            with profiling.stage("to_html"):
+                content = list(content)
+        with profiling.stage("write"):
+            # Joined so the writer can compare it with the existing file before writing
+            page = template.render(Title=title, Content=content)
+            if io is not None:
+                io.write(dest_path, page)
+            else:
+                atomic_write(dest_path, page)
+
+def generate_page_streaming(basepath, from_path, template_path, dest_path, cache=None, references: set = None, minify: bool = False, assets=None):
+    # Peak memory is bounded by the largest block rather than the document:
+    # a first pass finds the title (the template needs it before the content),
+    # a second pass reads, renders and writes one block at a time.
+    template = load_template(template_path, basepath, minify, assets)
+    with open(from_path, "r", encoding="utf-8") as source:
+        title = extract_title_from_lines(line.rstrip("\n") for line in source)
+    with profiling.page(from_path), profiling.stage("write"):
+        with open(from_path, "r", encoding="utf-8") as source:
+            content = iter_markdown_html(source, cache, basepath, minify, assets)
+            if references is not None:
+                references.update(template.references)
+                content = collect_references(content, references, basepath)
+            atomic_write(dest_path, template.iter_chunks(Title=title, Content=content))
 
 def read_file(path):
-    with open(path, "r") as f:
+    with open(path, "r", encoding="utf-8") as f:
         return f.read()
 
 def write_file(path, content):
-    with open(path, "w") as f:
+    with open(path, "w", encoding="utf-8") as f:
         f.write(content)
\ No newline at end of file
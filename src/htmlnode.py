@@ -1,21 +1,52 @@
+from minify import PRESERVE_WHITESPACE, attribute, collapse_whitespace
 
+# Attributes whose root-relative values are prefixed with the basepath when serialized
+# (as is every URL in a srcset)
+URL_ATTRIBUTES = frozenset(("href", "src"))
+
+def resolve_url(url: str, basepath: str = "/", assets=None) -> str:
+    if not url.startswith("/"):
+        return url
+    if assets is not None:
+        url = assets.resolve(url)
+    if basepath != "/":
+        url = basepath + url[1:]
+    return url
 
 class HTMLNode():
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag: str = None, value: str = None, children: list = None, props: dict =None):
         self.tag = tag
         self.value = value
         self.children = children
         self.props = props
     
-    def to_html(self):
+    # minify=True collapses whitespace runs in text outside PRESERVE_WHITESPACE
+    # elements and leaves attribute values unquoted where that is safe.
+    # assets (an assets.AssetManifest) points root-relative URL attributes at
+    # fingerprinted copies.
+    def to_html(self, basepath: str = "/", minify: bool = False, assets=None):
         raise NotImplementedError
+
+    def iter_html(self, basepath: str = "/", minify: bool = False, assets=None):
+        yield self.to_html(basepath, minify, assets)
+
+    def write_html(self, fp, basepath: str = "/", minify: bool = False, assets=None):
+        fp.writelines(self.iter_html(basepath, minify, assets))
     
-    def props_to_html(self):
+    def props_to_html(self, basepath: str = "/", minify: bool = False, assets=None):
         if self.props is None or self.props == {}:
             return ""
         props_html = ""
         for prop in self.props:
-            props_html += f' {prop}="{self.props[prop]}"'
+            value = self.props[prop]
+            if prop in URL_ATTRIBUTES:
+                value = resolve_url(value, basepath, assets)
+            elif prop == "srcset":
+                candidates = (candidate.strip().split(" ", 1) for candidate in value.split(","))
+                value = ", ".join(" ".join([resolve_url(url, basepath, assets)] + rest) for url, *rest in candidates)
+            props_html += attribute(prop, value, minify)
         return props_html
 
     def __repr__(self):
@@ -25,32 +56,81 @@ class HTMLNode():
         return self.__repr__()
     
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag: str, value: str, props: dict = None):
-        super().__init__(tag, value, None, props)
+        # Assigned directly rather than via super().__init__: leaves are built per inline node
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
     
-    def to_html(self):
+    def to_html(self, basepath: str = "/", minify: bool = False, assets=None):
         if self.value is None:
             raise ValueError("Invalid HTML: no value")
+        value = self.value
+        if minify and self.tag not in PRESERVE_WHITESPACE:
+            value = collapse_whitespace(value)
         if self.tag is None:
-            return self.value
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+            return value
+        return f"<{self.tag}{self.props_to_html(basepath, minify, assets)}>{value}</{self.tag}>"
+
+    def iter_html(self, basepath: str = "/", minify: bool = False, assets=None):
+        yield self.to_html(basepath, minify, assets)
 
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
 
+class HTMLFragment(LeafNode):
+    # Already serialized HTML (e.g. from the render cache), emitted verbatim
+    __slots__ = ()
+
+    def __init__(self, html: str):
+        super().__init__(None, html)
+
+    def to_html(self, basepath: str = "/", minify: bool = False, assets=None):
+        return self.value
+
+    def __repr__(self):
+        return f"HTMLFragment({self.value})"
+
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag: str, children: list, props: dict = None):
-        super().__init__(tag, None, children, props)
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props
+
+    def to_html(self, basepath: str = "/", minify: bool = False, assets=None):
+        return "".join(self.iter_html(basepath, minify, assets))
+
+    def iter_html(self, basepath: str = "/", minify: bool = False, assets=None):
+        # Walks the tree with an explicit stack so every chunk is yielded
+        # directly, however deep the tree is. Each stack entry carries the
+        # minify flag for its children, which is off below <pre> and friends.
+        self._check()
+        yield f"<{self.tag}{self.props_to_html(basepath, minify, assets)}>"
+        stack = [(self, iter(self.children), minify and self.tag not in PRESERVE_WHITESPACE)]
+        while stack:
+            node, children, collapse = stack[-1]
+            for child in children:
+                if isinstance(child, ParentNode):
+                    child._check()
+                    yield f"<{child.tag}{child.props_to_html(basepath, minify, assets)}>"
+                    stack.append((child, iter(child.children), collapse and child.tag not in PRESERVE_WHITESPACE))
+                    break
+                yield from child.iter_html(basepath, collapse, assets)
+            else:
+                stack.pop()
+                yield f"</{node.tag}>"
 
-    def to_html(self):
+    def _check(self):
         if self.tag is None:
             raise ValueError("Invalid HTML: no tag")
         if self.children is None:
             raise ValueError("Invalid HTML: no children")
-        children_html = ""
-        for child in self.children:
-            children_html += child.to_html()
-        return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
 
     def __repr__(self):
         return f"ParentNode({self.tag}, children: {self.children}, {self.props})"
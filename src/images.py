@@ -0,0 +1,308 @@
+import hashlib
+import json
+import os
+import posixpath
+import struct
+import zlib
+from itertools import accumulate
+from operator import add, floordiv, sub
+
+from fileio import file_digest
+
+DEFAULT_IMAGE_CACHE_DIR = "./.cache/images"
+DEFAULT_WIDTHS = (480, 960, 1440)
+# Bumped whenever the resampling or encoding changes, so cached variants are rebuilt
+IMAGE_VERSION = "1"
+RESIZABLE = frozenset((".png", ".jpg", ".jpeg", ".webp"))
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_mask = (255).__and__
+
+# url -> img attributes; set per build with configure_images
+_catalog = None
+_catalog_digest = None
+
+
+def _pillow():
+    # Optional: used for JPEG/WebP and for better resampling when installed
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+def image_size(path: str) -> tuple:
+    # (width, height) read from the file header, or None for unknown formats
+    # and truncated headers (a damaged file in public/ must not stop the build)
+    with open(path, "rb") as f:
+        head = f.read(32)
+        try:
+            if head.startswith(PNG_SIGNATURE) and head[12:16] == b"IHDR":
+                return struct.unpack(">II", head[16:24])
+            if head[:6] in (b"GIF87a", b"GIF89a"):
+                return struct.unpack("<HH", head[6:10])
+            if head.startswith(b"\xff\xd8"):
+                f.seek(2)
+                return _jpeg_size(f)
+        except struct.error:
+            return None
+    return None
+
+
+def _jpeg_size(f) -> tuple:
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        length = struct.unpack(">H", f.read(2))[0]
+        # SOF0..SOF15 except DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">xHH", f.read(5))
+            return width, height
+        f.seek(length - 2, 1)
+
+
+def decode_png(data: bytes) -> tuple:
+    # Pure-Python decoder for non-interlaced 8-bit grey/RGB/alpha PNGs;
+    # returns (width, height, channels, rows) or None if unsupported
+    if not data.startswith(PNG_SIGNATURE):
+        return None
+    pos = 8
+    header = None
+    idat = []
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif kind == b"IDAT":
+            idat.append(body)
+        elif kind == b"IEND":
+            break
+        pos += 12 + length
+    if header is None:
+        return None
+    width, height, depth, color, _, _, interlace = header
+    channels = {0: 1, 2: 3, 4: 2, 6: 4}.get(color)
+    if depth != 8 or channels is None or interlace:
+        return None
+    raw = zlib.decompress(b"".join(idat))
+    stride = width * channels
+    rows = []
+    prior = bytes(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        row = _unfilter(raw[start], raw[start + 1:start + 1 + stride], prior, channels)
+        rows.append(row)
+        prior = row
+    return width, height, channels, rows
+
+
+def _unfilter(kind: int, line: bytes, prior: bytes, bpp: int) -> bytes:
+    # None/Sub/Up run at C speed via map/accumulate; Average and Paeth need a loop
+    if kind == 0:
+        return line
+    if kind == 1:
+        row = bytearray(len(line))
+        for c in range(bpp):
+            row[c::bpp] = bytes(map(_mask, accumulate(line[c::bpp])))
+        return bytes(row)
+    if kind == 2:
+        return bytes(map(_mask, map(add, line, prior)))
+    row = bytearray(line)
+    for i in range(len(row)):
+        left = row[i - bpp] if i >= bpp else 0
+        up = prior[i]
+        if kind == 3:
+            row[i] = (row[i] + ((left + up) >> 1)) & 255
+            continue
+        upper_left = prior[i - bpp] if i >= bpp else 0
+        p = left + up - upper_left
+        pa, pb, pc = abs(p - left), abs(p - up), abs(p - upper_left)
+        if pa <= pb and pa <= pc:
+            row[i] = (row[i] + left) & 255
+        elif pb <= pc:
+            row[i] = (row[i] + up) & 255
+        else:
+            row[i] = (row[i] + upper_left) & 255
+    return bytes(row)
+
+
+def encode_png(width: int, height: int, channels: int, rows: list) -> bytes:
+    # Every row uses the Sub filter, which suits photos and is cheap to compute
+    color = {1: 0, 2: 4, 3: 2, 4: 6}[channels]
+    raw = bytearray()
+    for row in rows:
+        raw.append(1)
+        raw += row[:channels]
+        raw += bytes(map(_mask, map(int.__sub__, row[channels:], row[:-channels])))
+
+    def chunk(kind: bytes, body: bytes) -> bytes:
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, color, 0, 0, 0)
+    return PNG_SIGNATURE + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(bytes(raw), 6)) + chunk(b"IEND", b"")
+
+
+def resize_rows(width: int, height: int, channels: int, rows: list, new_width: int) -> tuple:
+    # Box filter: every output pixel is the mean of the source pixels it covers.
+    # Rows are summed first (zip/sum), then columns through per-channel prefix
+    # sums; both run inside map() rather than a Python loop per pixel.
+    # Returns (new_height, rows).
+    new_height = max(1, round(height * new_width / width))
+    row_bounds = [(y * height // new_height, (y + 1) * height // new_height) for y in range(new_height)]
+    lefts = [x * width // new_width for x in range(new_width)]
+    rights = [(x + 1) * width // new_width for x in range(new_width)]
+    spans = list(map(sub, rights, lefts))
+    resized = []
+    for top, bottom in row_bounds:
+        count = bottom - top
+        sums = list(map(sum, zip(*rows[top:bottom]))) if count > 1 else rows[top]
+        areas = [span * count for span in spans]
+        out = bytearray(new_width * channels)
+        for c in range(channels):
+            prefix = [0]
+            prefix.extend(accumulate(sums[c::channels]))
+            totals = map(sub, map(prefix.__getitem__, rights), map(prefix.__getitem__, lefts))
+            out[c::channels] = bytes(map(floordiv, totals, areas))
+        resized.append(bytes(out))
+    return new_height, resized
+
+
+def make_variant(source: str, target: str, width: int) -> bool:
+    # Writes source scaled to width pixels to target; False if the format is unsupported
+    Image = _pillow()
+    if Image is not None:
+        with Image.open(source) as image:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            resized.save(target, optimize=True, quality=82)
+        return True
+    if not source.lower().endswith(".png"):
+        return False
+    with open(source, "rb") as f:
+        decoded = decode_png(f.read())
+    if decoded is None:
+        return False
+    source_width, source_height, channels, rows = decoded
+    height, rows = resize_rows(source_width, source_height, channels, rows, width)
+    with open(target, "wb") as f:
+        f.write(encode_png(width, height, channels, rows))
+    return True
+
+
+def _make_cached(job: tuple) -> bool:
+    source, cached, width = job
+    # Keeps the extension, which Pillow picks the output format from
+    root, ext = os.path.splitext(cached)
+    tmp_path = f"{root}.tmp{ext}"
+    try:
+        made = make_variant(source, tmp_path, width)
+        if made:
+            os.replace(tmp_path, cached)
+        return made
+    finally:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+
+
+def variant_url(url: str, digest: str, width: int) -> str:
+    # Named after the source's content hash, so variants are immutable like fingerprinted assets
+    root, ext = posixpath.splitext(url)
+    return f"{root}.{digest[:10]}.{width}w{ext}"
+
+
+def build_variants(source_dir: str, target_dir: str, widths=DEFAULT_WIDTHS, jobs: int = None, cache_dir: str = None) -> tuple:
+    # Generates the resized variants of every image under source_dir into
+    # target_dir, reusing variants cached under cache_dir by source hash,
+    # width and encoder. Returns (catalog for configure_images, stats,
+    # {output path: source path}); with target_dir None only the catalog is made.
+    from assets import is_unchanged, transfer_file
+    cache_dir = cache_dir or DEFAULT_IMAGE_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    encoder = "pillow" if _pillow() is not None else "png"
+    catalog = {}
+    planned = []
+    for directory, dirs, files in os.walk(source_dir):
+        dirs.sort()
+        for file in sorted(files):
+            source = os.path.join(directory, file)
+            size = image_size(source)
+            if size is None:
+                continue
+            url = "/" + os.path.relpath(source, source_dir).replace(os.sep, "/")
+            entry = {"width": size[0], "height": size[1], "variants": []}
+            catalog[url] = entry
+            if os.path.splitext(file)[1].lower() not in RESIZABLE:
+                continue
+            digest = file_digest(source)
+            for width in sorted(set(widths)):
+                if width >= size[0]:
+                    continue
+                cached = os.path.join(cache_dir, f"{digest[:32]}-{width}w-{encoder}{IMAGE_VERSION}{os.path.splitext(file)[1].lower()}")
+                planned.append((source, cached, width, entry, variant_url(url, digest, width)))
+
+    missing = [(source, cached, width) for source, cached, width, _, _ in planned if not os.path.exists(cached)]
+    stats = {"generated": 0, "reused": len(planned) - len(missing), "unsupported": 0, "written": 0, "unchanged": 0}
+    if len(missing) > 1 and jobs != 1:
+        # Decoding and resampling are CPU-bound Python, so variants are made in processes
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as executor:
+            results = list(executor.map(_make_cached, missing))
+    else:
+        results = list(map(_make_cached, missing))
+    stats["generated"] = sum(results)
+    stats["unsupported"] = len(results) - stats["generated"]
+    outputs = {}
+    for source, cached, width, entry, url in planned:
+        if not os.path.exists(cached):
+            continue
+        entry["variants"].append([url, width])
+        if target_dir is None:
+            continue
+        output = os.path.normpath(os.path.join(target_dir, url.lstrip("/")))
+        if is_unchanged(cached, os.stat(cached), output):
+            stats["unchanged"] += 1
+        else:
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            transfer_file(cached, output)
+            stats["written"] += 1
+        outputs[output] = source
+    return catalog, stats, outputs
+
+
+def configure_images(catalog: dict = None):
+    # None turns the responsive image attributes off
+    global _catalog, _catalog_digest
+    _catalog = catalog
+    _catalog_digest = None
+    if catalog is not None:
+        _catalog_digest = hashlib.sha256(json.dumps(catalog, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def image_catalog() -> dict:
+    return _catalog
+
+
+def catalog_digest() -> str:
+    return _catalog_digest
+
+
+def image_attributes(url: str) -> dict:
+    # Extra <img> attributes for url: intrinsic size (so the layout does not
+    # shift while it loads), a srcset of the resized variants, and lazy loading
+    if _catalog is None:
+        return None
+    attributes = {}
+    entry = _catalog.get(url)
+    if entry is not None:
+        if entry["variants"]:
+            candidates = [f"{variant} {width}w" for variant, width in entry["variants"]]
+            candidates.append(f"{url} {entry['width']}w")
+            attributes["srcset"] = ", ".join(candidates)
+        attributes["width"] = str(entry["width"])
+        attributes["height"] = str(entry["height"])
+    attributes["loading"] = "lazy"
+    return attributes
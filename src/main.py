@@ -1,51 +1,674 @@
-from helper import generate_page
+from __future__ import annotations
+
+from fileio import FileIO, DEFAULT_IN_FLIGHT, output_stats, record_output, remove_empty_parents, reset_output_stats
+import argparse
+import contextlib
+import io
 import os
 import sys
 
+# Everything else is imported by the code paths that use it, so startup
+# (--help, serve, daemon, the daemon's client) does not pay for the renderer,
+# the image pipeline or the caches
+
 
-def copy_static_to_public(source_dir: str = None, target_dir: str = None):
-    import shutil
-    import os
+def _static_dirs(source_dir: str = None, target_dir: str = None) -> tuple:
     if not source_dir:
         source_dir = "./public"
     if not target_dir:
         target_dir = "./docs"
-    
+
     # check if paths are within project workspace
     if not os.path.abspath(source_dir).startswith(os.path.abspath(os.getcwd())):
         raise ValueError("Source directory is not within the project workspace")
     if not os.path.abspath(target_dir).startswith(os.path.abspath(os.getcwd())):
         raise ValueError("Target directory is not within the project workspace")
-    
-    if os.path.exists(target_dir):
-        shutil.rmtree(target_dir)
-    
-    shutil.copytree(source_dir, target_dir)
+    return source_dir, target_dir
 
-def generate_pages_recursive(basepath: str, dir_path_content: str, template_path: str, dest_dir_path: str):
-    # Check that path is within workspace directory
-    
-    if not os.path.exists(dest_dir_path):
-        os.mkdir(dest_dir_path)
+def sync_static_to_public(source_dir: str = None, target_dir: str = None, checksum: bool = False, hardlink: bool = False, assets: AssetManifest = None) -> dict:
+    # Only copies changed assets and only removes assets deleted from source_dir
+    from assets import sync_static
+    source_dir, target_dir = _static_dirs(source_dir, target_dir)
+    return sync_static(source_dir, target_dir, checksum=checksum, hardlink=hardlink, assets=assets)
 
-    for file in os.listdir(dir_path_content):
-        if os.path.isfile(os.path.join(dir_path_content, file)):
-            # If the file is an .md file generate the page
+def collect_pages(dir_path_content: str, dest_dir_path: str) -> list:
+    # Walk the content tree in sorted order so builds are deterministic
+    pages = []
+    for file in sorted(os.listdir(dir_path_content)):
+        from_path = os.path.join(dir_path_content, file)
+        if os.path.isfile(from_path):
             if file.endswith(".md"):
                 html_file = file.replace(".md", ".html")
-                generate_page(basepath,os.path.join(dir_path_content, file), template_path, os.path.join(dest_dir_path, html_file))
+                pages.append((from_path, os.path.join(dest_dir_path, html_file)))
         else:
-            generate_pages_recursive(basepath, os.path.join(dir_path_content, file), template_path, os.path.join(dest_dir_path, file))
+            pages.extend(collect_pages(from_path, os.path.join(dest_dir_path, file)))
+    return pages
+
+_worker_cache = None
 
-def main():
-    
-    if len(sys.argv) == 2:
-        basepath = sys.argv[1]
+def _render_page_job(job: tuple) -> tuple:
+    # Runs in a worker process; captures the log so the parent can print it in order.
+    # Counters are returned as deltas for this page so the parent can sum them.
+    from helper import configure_inline_memo, generate_page, inline_memo
+    global _worker_cache
+    basepath, from_path, template_path, dest_path, cache_config, want_references, memo_entries, minify, assets, catalog = job
+    cache = None
+    if cache_config is not None:
+        if _worker_cache is None:
+            from render_cache import RenderCache
+            _worker_cache = RenderCache(*cache_config)
+        cache = _worker_cache
+    if inline_memo.max_entries != memo_entries:
+        configure_inline_memo(memo_entries)
+    use_image_catalog(catalog)
+    before = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    memo_before = (inline_memo.hits, inline_memo.misses)
+    page_references = set() if want_references else None
+    reset_output_stats()
+    log = io.StringIO()
+    error = None
+    try:
+        with contextlib.redirect_stdout(log):
+            generate_page(basepath, from_path, template_path, dest_path, cache, page_references, minify=minify, assets=assets)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        page_references = None
+    after = (0, 0)
+    if cache is not None:
+        cache.flush()
+        after = (cache.hits, cache.misses)
+    counters = {
+        "cache": (after[0] - before[0], after[1] - before[1]),
+        "inline": (inline_memo.hits - memo_before[0], inline_memo.misses - memo_before[1]),
+        "outputs": output_stats(),
+    }
+    return log.getvalue(), error, page_references, counters
+
+def render_pages(basepath: str, pages: list, template_path: str, jobs: int = 1, cache: RenderCache = None, references: dict = None, in_flight: int = DEFAULT_IN_FLIGHT, minify: bool = False, assets: AssetManifest = None) -> tuple:
+    # If references is given, it maps each built source to the URLs its page references.
+    # in_flight bounds the reads and writes overlapped with rendering (0 = inline I/O).
+    from helper import STREAMING_THRESHOLD, generate_page, inline_memo
+    from images import image_catalog
+    for dest_dir in sorted({os.path.dirname(dest_path) for _, dest_path in pages}):
+        os.makedirs(dest_dir, exist_ok=True)
+
+    built = []
+    failures = []
+    if jobs <= 1 or len(pages) <= 1:
+        page_io = FileIO(in_flight, STREAMING_THRESHOLD) if in_flight > 0 and len(pages) > 1 else None
+        if page_io is not None:
+            page_io.prefetch(from_path for from_path, _ in pages)
+        with page_io or contextlib.nullcontext():
+            for from_path, dest_path in pages:
+                page_references = set() if references is not None else None
+                try:
+                    generate_page(basepath, from_path, template_path, dest_path, cache, page_references, page_io, minify, assets)
+                except Exception as e:
+                    # Reported like a failed -j worker page; the rest of the build goes on
+                    print(f"Error generating page from {from_path}: {type(e).__name__}: {e}", file=sys.stderr)
+                    failures.append(from_path)
+                    continue
+                if references is not None:
+                    references[from_path] = page_references
+                built.append(from_path)
+        return built, failures
+
+    from concurrent.futures import ProcessPoolExecutor
+    if cache is not None:
+        # Workers open their own connection; pending entries must be visible to them
+        cache.flush()
+        cache_config = (cache.path, cache.max_bytes, cache.version)
     else:
-        basepath = "/"
+        cache_config = None
+    job_list = [
+        (basepath, from_path, template_path, dest_path, cache_config, references is not None, inline_memo.max_entries, minify, assets, image_catalog())
+        for from_path, dest_path in pages
+    ]
+    chunksize = max(1, len(job_list) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # map() yields in submission order, which keeps the log deterministic
+        results = executor.map(_render_page_job, job_list, chunksize=chunksize)
+        for (from_path, _), (log, error, page_references, counters) in zip(pages, results):
+            sys.stdout.write(log)
+            for outcome, count in counters["outputs"].items():
+                record_output(outcome, count)
+            if cache is not None:
+                cache.hits += counters["cache"][0]
+                cache.misses += counters["cache"][1]
+            inline_memo.hits += counters["inline"][0]
+            inline_memo.misses += counters["inline"][1]
+            if error is None:
+                if references is not None:
+                    references[from_path] = page_references
+                built.append(from_path)
+                continue
+            print(f"Error generating page from {from_path}: {error}", file=sys.stderr)
+            failures.append(from_path)
+    return built, failures
+
+def generate_pages_recursive(basepath: str, dir_path_content: str, template_path: str, dest_dir_path: str, manifest: BuildManifest = None, jobs: int = 1, cache: RenderCache = None, graph: DependencyGraph = None, in_flight: int = DEFAULT_IN_FLIGHT, shard: tuple = None, minify: bool = False, assets: AssetManifest = None):
+    # Check that path is within workspace directory
+    from images import catalog_digest
+    from shards import select_shard
+
+    if not os.path.exists(dest_dir_path):
+        os.makedirs(dest_dir_path)
+
+    pages = collect_pages(dir_path_content, dest_dir_path)
+    if shard is not None:
+        pages = select_shard(pages, dir_path_content, shard)
+    if manifest is not None:
+        template_hash = manifest.template_hash(template_path)
+        # Every page links the assets through their fingerprints, so any asset change makes all pages stale
+        assets_hash = assets.digest if assets is not None else None
+        images_hash = catalog_digest()
+        digests = {}
+        stale = []
+        for from_path, dest_path in pages:
+            source_hash = manifest.source_hash(from_path)
+            digest = manifest.page_hash(source_hash, template_hash, basepath, minify, assets_hash, images_hash)
+            if manifest.is_fresh(from_path, digest, dest_path):
+                continue
+            digests[from_path] = (source_hash, digest, dest_path)
+            stale.append((from_path, dest_path))
+        pages = stale
+
+    references = {} if graph is not None else None
+    built, failures = render_pages(basepath, pages, template_path, jobs, cache, references, in_flight, minify, assets)
+    if manifest is not None:
+        # Pages that did build are recorded so the next run only retries the failures
+        for from_path in built:
+            manifest.record(from_path, *digests[from_path])
+    if graph is not None:
+        dest_paths = dict(pages)
+        for from_path in built:
+            graph.record_page(dest_paths[from_path], from_path, template_path, references[from_path], dest_dir_path)
+    if failures:
+        raise RuntimeError(f"Failed to generate {len(failures)} page(s): {', '.join(failures)}")
+
+def record_static(graph: DependencyGraph, source_dir: str, target_dir: str, assets: AssetManifest = None):
+    from assets import asset_targets
+    for directory, _, files in os.walk(source_dir):
+        for file in files:
+            source = os.path.join(directory, file)
+            for rel_path in asset_targets(os.path.relpath(source, source_dir), assets):
+                graph.record_static(os.path.join(target_dir, rel_path), source)
+
+def build_changed(basepath: str, changed: list, graph: DependencyGraph, content_dir: str, template_path: str, static_dir: str, dest_dir: str, cache: RenderCache = None, in_flight: int = DEFAULT_IN_FLIGHT, minify: bool = False, assets: AssetManifest = None, jobs: int = 1) -> int:
+    # Regenerates exactly the outputs that transitively depend on the changed
+    # paths; returns the number of outputs rebuilt or removed.
+    # The graph stores paths relative to the working directory (as editors
+    # may pass absolute ones)
+    from compress import remove_siblings
+    changed = [os.path.relpath(os.path.abspath(path)) for path in changed]
+    touched = 0
+    pages = []
+    for output in graph.affected(changed):
+        node = graph.nodes[output]
+        source = node["inputs"][0]
+        if not os.path.exists(source):
+            if os.path.exists(output):
+                os.remove(output)
+                remove_siblings(output)
+                remove_empty_parents(os.path.dirname(output), dest_dir)
+                record_output("removed")
+                print(f"Removed {output}")
+                touched += 1
+            graph.remove(output)
+        elif node["kind"] == "static":
+            copy_output(source, output)
+            touched += 1
+        else:
+            pages.append((source, output))
+    # New pages and assets have no graph entry yet
+    known_sources = {node["inputs"][0] for node in graph.nodes.values()}
+    for path in changed:
+        if path in known_sources or not os.path.isfile(path):
+            continue
+        if path.endswith(".md") and _is_within(path, content_dir):
+            rel_dir, file = os.path.split(os.path.relpath(path, content_dir))
+            pages.append((path, os.path.normpath(os.path.join(dest_dir, rel_dir, file.replace(".md", ".html")))))
+        elif _is_within(path, static_dir):
+            output = os.path.join(dest_dir, os.path.relpath(path, static_dir))
+            copy_output(path, output)
+            graph.record_static(output, path)
+            touched += 1
+    references = {}
+    built, failures = render_pages(basepath, pages, template_path, jobs, cache, references, in_flight, minify, assets)
+    dest_paths = dict(pages)
+    for from_path in built:
+        graph.record_page(dest_paths[from_path], from_path, template_path, references[from_path], dest_dir)
+    if failures:
+        raise RuntimeError(f"Failed to generate {len(failures)} page(s): {', '.join(failures)}")
+    return touched + len(built)
+
+def copy_output(source: str, output: str):
+    from assets import is_unchanged, transfer_file
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    if is_unchanged(source, os.stat(source), output, checksum=True):
+        record_output("unchanged")
+        return
+    transfer_file(source, output)
+    record_output("written")
+
+def remove_stale_outputs(dest_dir: str, outputs) -> list:
+    # Deletes files under dest_dir that the build did not produce, replacing
+    # the wipe-and-recopy of full builds so unchanged outputs keep their mtimes
+    outputs = {os.path.normpath(path) for path in outputs}
+    removed = []
+    for directory, dirs, files in os.walk(dest_dir, topdown=False):
+        for file in sorted(files):
+            path = os.path.normpath(os.path.join(directory, file))
+            if path not in outputs:
+                os.remove(path)
+                removed.append(path)
+        if directory != dest_dir and not os.listdir(directory):
+            os.rmdir(directory)
+    record_output("removed", len(removed))
+    return removed
+
+def remove_previous_outputs(dest_dir: str, previous: list, outputs) -> list:
+    # Deletes the files of an earlier build listed in previous (paths relative
+    # to dest_dir, "/"-separated) that this build did not produce again
+    outputs = {os.path.normpath(path) for path in outputs}
+    removed = []
+    for rel_path in sorted(previous):
+        path = os.path.normpath(os.path.join(dest_dir, rel_path))
+        if path in outputs or not _is_within(path, dest_dir) or not os.path.isfile(path):
+            continue
+        os.remove(path)
+        removed.append(path)
+        remove_empty_parents(os.path.dirname(path), dest_dir)
+    record_output("removed", len(removed))
+    return removed
+
+def _is_within(path: str, directory: str) -> bool:
+    directory = os.path.abspath(directory)
+    return os.path.commonpath([os.path.abspath(path), directory]) == directory
+
+def parse_widths(value: str) -> tuple:
+    try:
+        widths = tuple(sorted({int(width) for width in value.split(",")}))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated pixel widths, got {value!r}")
+    if not widths or widths[0] <= 0:
+        raise argparse.ArgumentTypeError(f"widths must be positive, got {value!r}")
+    return widths
+
+def parse_args(argv: list):
+    from compress import DEFAULT_MIN_SIZE
+    from images import DEFAULT_WIDTHS
+    from shards import parse_shard
+    parser = argparse.ArgumentParser(description="Build the static site from ./content into ./docs")
+    parser.add_argument("basepath", nargs="?", default="/", help="base path prepended to root-relative links")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only rebuild pages whose markdown, template or basepath changed")
+    parser.add_argument("--manifest", default=None, help="path of the incremental build manifest")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of worker processes used to render pages (default 1, 0 = one per CPU); also bounds --precompress threads, which otherwise use one per CPU")
+    parser.add_argument("--checksum", action="store_true",
+                        help="with --incremental, also compare static assets by content hash when their mtime differs (full builds always do)")
+    parser.add_argument("--hardlink", action="store_true",
+                        help="hardlink static assets into ./docs instead of copying them")
+    parser.add_argument("--io-in-flight", type=int, default=DEFAULT_IN_FLIGHT, metavar="N",
+                        help="source reads and page writes overlapped with rendering (0 = read and write inline)")
+    parser.add_argument("--precompress", action="store_true",
+                        help="write .gz (and .br if the brotli module is installed) next to HTML and text assets")
+    parser.add_argument("--precompress-min-size", type=int, default=DEFAULT_MIN_SIZE, metavar="BYTES",
+                        help="files smaller than this are not precompressed")
+    parser.add_argument("--minify", action="store_true",
+                        help="write minified HTML: collapsed whitespace outside <pre>/<code>, no template comments, unquoted attributes where safe")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="also write static assets under content-hashed names (index.<hash>.css) plus docs/asset-manifest.json, and link pages to those")
+    parser.add_argument("--responsive-images", action="store_true",
+                        help="write resized variants of images in public/ and give <img> tags srcset, width, height and loading=lazy")
+    parser.add_argument("--image-widths", type=parse_widths, default=DEFAULT_WIDTHS, metavar="W,W,...",
+                        help="widths in pixels of the resized variants (default %(default)s); images are never enlarged")
+    parser.add_argument("--shard", type=parse_shard, metavar="K/N",
+                        help="render only shard K of N of the pages into --shard-dir; combine shards with 'main.py merge'")
+    parser.add_argument("--shard-dir", default=None, metavar="DIR",
+                        help="output directory of a --shard build (default ./shards/K-of-N)")
+    parser.add_argument("--changed", nargs="+", metavar="PATH",
+                        help="only regenerate outputs that depend on these paths (uses the graph from the last build)")
+    parser.add_argument("--deps", default=None, help="path of the dependency graph")
+    parser.add_argument("--render-cache", nargs="?", const="./.cache/render-cache.sqlite", default=None, metavar="PATH",
+                        help="reuse rendered HTML of unchanged blocks from a persistent SQLite cache")
+    parser.add_argument("--render-cache-size", type=int, default=64, metavar="MB",
+                        help="size bound of the render cache; least recently used blocks are evicted")
+    parser.add_argument("--inline-memo", type=int, default=4096, metavar="N",
+                        help="inline fragments kept rendered for reuse across pages (0 disables)")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each build stage and page and print a summary (forces --jobs 1 and --io-in-flight 0)")
+    parser.add_argument("--profile-top", type=int, default=10, metavar="N",
+                        help="number of slowest pages listed by --profile")
+    parser.add_argument("--profile-stats", metavar="FILE",
+                        help="with --profile, also run the build under cProfile and dump pstats to FILE")
+    parser.add_argument("--profile-trace", metavar="FILE",
+                        help="with --profile, write per-stage and per-page timings as a JSON trace to FILE")
+    args = parser.parse_args(argv)
+    if args.shard and (args.incremental or args.changed):
+        parser.error("--shard cannot be combined with --incremental or --changed")
+    return args
+
+def main(argv: list = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["serve"]:
+        import server
+        server.main(argv[1:])
+        return
+    if argv[:1] == ["merge"]:
+        merge_main(argv[1:])
+        return
+    if argv[:1] == ["daemon"]:
+        from daemon import BuildDaemon, parse_args as parse_daemon_args
+        BuildDaemon(parse_daemon_args(argv[1:]).socket).serve()
+        return
+    args = parse_args(argv)
+    if not args.profile:
+        build(args)
+        return
+
+    from profiling import BuildProfiler
+    if args.jobs not in (None, 1):
+        print("--profile renders pages in a single process; ignoring --jobs")
+        args.jobs = 1
+    if args.io_in_flight:
+        # Queued reads and writes would finish on other threads, outside the timed stages
+        print("--profile reads and writes pages inline; ignoring --io-in-flight")
+        args.io_in_flight = 0
+    profiler = BuildProfiler(trace=args.profile_trace is not None)
+    with profiler:
+        if args.profile_stats:
+            import cProfile
+            stats_profiler = cProfile.Profile()
+            stats_profiler.runcall(build, args)
+            stats_profiler.dump_stats(args.profile_stats)
+        else:
+            build(args)
+    print()
+    print(profiler.summary(args.profile_top))
+    if args.profile_stats:
+        print(f"cProfile stats written to {args.profile_stats}")
+    if args.profile_trace:
+        profiler.write_trace(args.profile_trace)
+        print(f"Timing trace written to {args.profile_trace}")
+
+def use_image_catalog(catalog: dict):
+    # Memoized image nodes carry the attributes of the catalog they were made
+    # with, so the memo only survives while the catalog stays the same
+    from helper import inline_memo
+    from images import configure_images, image_catalog
+    if image_catalog() != catalog:
+        configure_images(catalog)
+        inline_memo.clear()
+
+def build(args, cache: RenderCache = None):
+    # cache is an already open render cache (the build daemon keeps one);
+    # otherwise --render-cache opens one for this build
+    from helper import configure_inline_memo, inline_memo
+    from render_cache import RenderCache
+    own_cache = cache is None and args.render_cache
+    if own_cache:
+        cache = RenderCache(args.render_cache, args.render_cache_size * 1024 * 1024)
+    if cache is not None:
+        cache.hits = cache.misses = 0
+    configure_inline_memo(args.inline_memo)
+    use_image_catalog(None)
+    inline_memo.hits = inline_memo.misses = 0
+    reset_output_stats()
+    try:
+        _build(args, cache)
+    finally:
+        if cache is not None:
+            if own_cache:
+                cache.close()
+            else:
+                cache.evict()
+            print(f"Render cache: {cache.hits} hits, {cache.misses} misses")
+    if inline_memo.max_entries > 0:
+        print(f"Inline memo: {inline_memo.hits} hits, {inline_memo.misses} misses (max {inline_memo.max_entries} entries)")
+    report_outputs()
+
+def report_outputs():
+    stats = output_stats()
+    print(f"Outputs: {stats['written']} written, {stats['unchanged']} unchanged, {stats['removed']} removed")
+
+def build_options(args) -> dict:
+    # Settings that change the bytes of every page; outputs built with
+    # different options must not be mixed
+    return {
+        "minify": args.minify,
+        "fingerprint": args.fingerprint,
+        "image_widths": list(args.image_widths) if args.responsive_images else None,
+    }
+
+def image_stage(widths, static_dir: str, dest_dir: str, jobs: int = None) -> dict:
+    # Makes (or reuses) the resized image variants, copies them into dest_dir
+    # (unless it is None) and configures the <img> attributes pages get.
+    # Returns {variant output: source image}.
+    from images import build_variants
+    import profiling
+    with profiling.stage("images"):
+        catalog, stats, outputs = build_variants(static_dir, dest_dir, widths, jobs)
+    use_image_catalog(catalog)
+    record_output("written", stats["written"])
+    record_output("unchanged", stats["unchanged"])
+    print("Images: " + ", ".join(f"{count} {name}" for name, count in stats.items()))
+    return outputs
+
+def update_asset_manifest(dest_dir: str, assets: AssetManifest) -> list:
+    # Writes (or, when not fingerprinting, removes) dest_dir/asset-manifest.json;
+    # returns the outputs to keep
+    from assets import ASSET_MANIFEST, write_asset_manifest
+    if assets is None:
+        path = os.path.join(dest_dir, ASSET_MANIFEST)
+        if os.path.exists(path):
+            os.remove(path)
+            record_output("removed")
+        return []
+    return [write_asset_manifest(dest_dir, assets)]
+
+def build_shard(args, cache: RenderCache, jobs: int, assets: AssetManifest = None):
+    # Renders this shard's pages only; static assets and image variants are added by the merge
+    from deps import DependencyGraph
+    from images import catalog_digest
+    from shards import SHARD_MANIFEST, load_shard_manifest, write_shard_manifest
+    k, n = args.shard
+    shard_dir = args.shard_dir or os.path.join(".", "shards", f"{k}-of-{n}")
+    if not os.path.abspath(shard_dir).startswith(os.path.abspath(os.getcwd())):
+        raise ValueError("Shard directory is not within the project workspace")
+    # Only files an earlier shard build wrote are ever deleted, so the shard
+    # directory must be new, empty, or the output of an earlier shard build
+    previous = []
+    if os.path.isdir(shard_dir) and os.listdir(shard_dir):
+        try:
+            previous = list(load_shard_manifest(shard_dir)["files"])
+        except ValueError:
+            raise ValueError(f"{shard_dir} is not empty and has no {SHARD_MANIFEST}; refusing to write a shard into it")
+    if args.responsive_images:
+        image_stage(args.image_widths, "./public", None, jobs)
+    graph = DependencyGraph()
+    graph.basepath = args.basepath
+    generate_pages_recursive(args.basepath, "./content", "./template.html", shard_dir, jobs=jobs, cache=cache, graph=graph, in_flight=args.io_in_flight, shard=args.shard, minify=args.minify, assets=assets)
+    remove_previous_outputs(shard_dir, previous, graph.nodes)
+    write_shard_manifest(shard_dir, args.shard, args.basepath, graph, "./docs", build_options(args), assets, catalog_digest())
+    print(f"Shard {k}/{n}: {len(graph.nodes)} page(s) in {shard_dir}")
+
+def merge_shards(shard_dirs: list, static_dir: str = "./public", dest_dir: str = "./docs", deps_path: str = None, precompress_min_size: int = None) -> int:
+    # Combines shard outputs and the static assets into dest_dir, refusing to
+    # touch it if the shards are incomplete, inconsistent or overlap
+    from assets import asset_manifest
+    from compress import precompress
+    from deps import DependencyGraph
+    from images import build_variants, catalog_digest, configure_images
+    from fileio import file_digest
+    from shards import check_shards, load_shard_manifest
+    manifests = {shard_dir: load_shard_manifest(shard_dir) for shard_dir in shard_dirs}
+    static_files = set()
+    for directory, _, files in os.walk(static_dir):
+        for file in files:
+            static_files.add(os.path.relpath(os.path.join(directory, file), static_dir).replace(os.sep, "/"))
+    problems = check_shards(manifests, static_files)
+    for shard_dir, manifest in manifests.items():
+        for rel_path, digest in manifest["files"].items():
+            path = os.path.join(shard_dir, rel_path)
+            if not os.path.isfile(path) or file_digest(path) != digest:
+                problems.append(f"{path} is missing or does not match the shard manifest")
+    first = next(iter(manifests.values()))
+    assets = None
+    if first.get("options", {}).get("fingerprint"):
+        # Pages link the fingerprints the shards computed; the assets must still have them
+        assets = asset_manifest(static_dir)
+        if not problems and assets.urls != first["assets"]:
+            problems.append(f"static assets in {static_dir} changed since the shards were built")
+    widths = first.get("options", {}).get("image_widths")
+    if widths and not problems:
+        # Likewise the image variants and sizes the pages were rendered with
+        configure_images(build_variants(static_dir, None, widths)[0])
+        if catalog_digest() != first.get("images"):
+            problems.append(f"images in {static_dir} changed since the shards were built")
+    if problems:
+        for problem in problems:
+            print(f"Merge error: {problem}", file=sys.stderr)
+        raise RuntimeError(f"Cannot merge shards: {len(problems)} problem(s)")
+
+    record_static_sync(sync_static_to_public(static_dir, dest_dir, checksum=True, assets=assets))
+    graph = DependencyGraph(deps_path)
+    graph.basepath = first["basepath"]
+    graph.options = first.get("options", {})
+    record_static(graph, static_dir, dest_dir, assets)
+    if widths:
+        for output, source in image_stage(widths, static_dir, dest_dir).items():
+            graph.record_static(output, source)
+    pages = 0
+    for shard_dir, manifest in manifests.items():
+        for rel_path in sorted(manifest["files"]):
+            output = os.path.normpath(os.path.join(dest_dir, rel_path))
+            copy_output(os.path.join(shard_dir, rel_path), output)
+            graph.nodes[output] = {"kind": "page", "inputs": manifest["deps"][rel_path]}
+            pages += 1
+    siblings = []
+    if precompress_min_size is not None:
+        stats, siblings = precompress(graph.nodes, precompress_min_size)
+        print("Precompressed: " + ", ".join(f"{count} {name}" for name, count in stats.items()))
+    kept = update_asset_manifest(dest_dir, assets)
+    remove_stale_outputs(dest_dir, list(graph.nodes) + siblings + kept)
+    graph.save()
+    return pages
+
+def merge_main(argv: list):
+    from compress import DEFAULT_MIN_SIZE
+    parser = argparse.ArgumentParser(prog="main.py merge", description="Combine --shard build outputs into docs/")
+    parser.add_argument("shard_dirs", nargs="+", metavar="SHARD_DIR")
+    parser.add_argument("--deps", default=None, help="path of the dependency graph to write")
+    parser.add_argument("--precompress", action="store_true", help="write .gz/.br siblings, as for a build")
+    parser.add_argument("--precompress-min-size", type=int, default=DEFAULT_MIN_SIZE, metavar="BYTES")
+    args = parser.parse_args(argv)
+    reset_output_stats()
+    pages = merge_shards(args.shard_dirs, deps_path=args.deps,
+                         precompress_min_size=args.precompress_min_size if args.precompress else None)
+    print(f"Merged {len(args.shard_dirs)} shard(s): {pages} page(s)")
+    report_outputs()
+
+def precompress_outputs(args, outputs) -> list:
+    # Post-render stage: .gz/.br siblings for text outputs, for servers that
+    # serve precompressed variants. Returns the siblings so sweeps keep them.
+    from compress import precompress, remove_siblings
+    if not args.precompress:
+        # Siblings left by an earlier --precompress build would serve the old
+        # bytes of outputs this build rewrote
+        record_output("removed", sum(map(remove_siblings, outputs)))
+        return []
+    import profiling
+    with profiling.stage("precompress"):
+        # Unless -j is given, compression runs on every CPU: it releases the GIL
+        stats, siblings = precompress(outputs, args.precompress_min_size, args.jobs if args.jobs and args.jobs > 0 else None)
+    print("Precompressed: " + ", ".join(f"{count} {name}" for name, count in stats.items()))
+    return siblings
+
+def record_static_sync(stats: dict):
+    record_output("written", stats["copied"] + stats["linked"] + stats["reflinked"])
+    record_output("unchanged", stats["unchanged"])
+    record_output("removed", stats["removed"])
+
+def _build(args, cache: RenderCache = None):
+    from assets import asset_manifest
+    from compress import remove_siblings
+    from deps import DependencyGraph
+    from manifest import BuildManifest
+    import profiling
+    basepath = args.basepath
+    jobs = 1 if args.jobs is None else args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
     print(f"Basepath: {basepath}")
-    copy_static_to_public()
-    generate_pages_recursive(basepath, "./content", "./template.html", "./docs")
+    assets = None
+    if args.fingerprint:
+        with profiling.stage("fingerprint"):
+            assets = asset_manifest("./public")
+    if args.shard:
+        build_shard(args, cache, jobs, assets)
+        return
+    options = build_options(args)
+    graph = DependencyGraph.load(args.deps)
+    if args.changed:
+        # A changed asset gets a new fingerprint (or new image variants), which pages link to
+        derived = assets is not None or args.responsive_images
+        static_changed = derived and any(_is_within(os.path.normpath(path), "./public") for path in args.changed)
+        if graph.nodes and graph.basepath == basepath and graph.options == options and not static_changed:
+            if args.responsive_images:
+                image_stage(args.image_widths, "./public", None, jobs)
+            touched = build_changed(basepath, args.changed, graph, "./content", "./template.html", "./public", "./docs", cache, args.io_in_flight, args.minify, assets, jobs)
+            print(f"Regenerated {touched} output(s) affected by {len(args.changed)} changed path(s)")
+            precompress_outputs(args, graph.nodes)
+            graph.save()
+            return
+        if static_changed:
+            print("Fingerprinted or resized static assets changed; running a full build")
+        else:
+            print("No dependency graph for this basepath and these options yet; running a full build")
+
+    if graph.basepath != basepath or graph.options != options:
+        graph = DependencyGraph(graph.path)
+    graph.basepath = basepath
+    graph.options = options
+    if not args.incremental:
+        # Everything is regenerated, but files whose bytes did not change are
+        # left alone, and anything the build no longer produces is deleted
+        with profiling.stage("copy_static"):
+            record_static_sync(sync_static_to_public(checksum=True, hardlink=args.hardlink, assets=assets))
+        graph.nodes = {}
+        record_static(graph, "./public", "./docs", assets)
+        if args.responsive_images:
+            for output, source in image_stage(args.image_widths, "./public", "./docs", jobs).items():
+                graph.record_static(output, source)
+        generate_pages_recursive(basepath, "./content", "./template.html", "./docs", jobs=jobs, cache=cache, graph=graph, in_flight=args.io_in_flight, minify=args.minify, assets=assets)
+        siblings = precompress_outputs(args, graph.nodes)
+        kept = update_asset_manifest("./docs", assets)
+        remove_stale_outputs("./docs", list(graph.nodes) + siblings + kept)
+        graph.save()
+        return
+
+    manifest = BuildManifest.load(args.manifest)
+    with profiling.stage("copy_static"):
+        stats = sync_static_to_public(checksum=args.checksum, hardlink=args.hardlink, assets=assets)
+    print("Static assets: " + (", ".join(f"{count} {name}" for name, count in stats.items() if count) or "none"))
+    record_static_sync(stats)
+    record_static(graph, "./public", "./docs", assets)
+    if args.responsive_images:
+        for output, source in image_stage(args.image_widths, "./public", "./docs", jobs).items():
+            graph.record_static(output, source)
+    update_asset_manifest("./docs", assets)
+    try:
+        generate_pages_recursive(basepath, "./content", "./template.html", "./docs", manifest, jobs, cache, graph, args.io_in_flight, minify=args.minify, assets=assets)
+        for removed in manifest.prune():
+            print(f"Removed stale page {removed}")
+            remove_siblings(removed)
+            remove_empty_parents(os.path.dirname(removed), "./docs")
+            record_output("removed")
+            graph.remove(removed)
+        precompress_outputs(args, graph.nodes)
+    finally:
+        manifest.save()
+        graph.save()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+
+from fileio import save_json
+
+MANIFEST_VERSION = 1
+DEFAULT_MANIFEST_PATH = "./.cache/build-manifest.json"
+
+
+def hash_bytes(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(part)
+        # separator so ("ab", "c") and ("a", "bc") hash differently
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class BuildManifest():
+    def __init__(self, path: str = None):
+        self.path = path or DEFAULT_MANIFEST_PATH
+        self.pages = {}
+        self.seen = set()
+        self._template_hashes = {}
+
+    @classmethod
+    def load(cls, path: str = None):
+        manifest = cls(path)
+        if not os.path.exists(manifest.path):
+            return manifest
+        try:
+            with open(manifest.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # A corrupt manifest only costs us a full rebuild
+            return manifest
+        if data.get("version") != MANIFEST_VERSION:
+            return manifest
+        manifest.pages = data.get("pages", {})
+        return manifest
+
+    def save(self):
+        save_json(self.path, {"version": MANIFEST_VERSION, "pages": self.pages})
+
+    def source_hash(self, from_path: str) -> str:
+        # Reuse the stored hash when size and mtime are unchanged so a no-op
+        # build only stats the sources instead of reading them all.
+        stat = os.stat(from_path)
+        entry = self.pages.get(from_path)
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return entry["source_hash"]
+        with open(from_path, "rb") as f:
+            return hash_bytes(f.read())
+
+    def template_hash(self, template_path: str) -> str:
+        if template_path not in self._template_hashes:
+            with open(template_path, "rb") as f:
+                self._template_hashes[template_path] = hash_bytes(f.read())
+        return self._template_hashes[template_path]
+
+    def page_hash(self, source_hash: str, template_hash: str, basepath: str, minify: bool = False, assets_hash: str = None, images_hash: str = None) -> str:
+        # Plain builds keep the digests they had before these options existed
+        parts = [source_hash, template_hash, basepath]
+        if minify:
+            parts.append("minify")
+        if assets_hash is not None:
+            parts.append(assets_hash)
+        if images_hash is not None:
+            parts.append("images:" + images_hash)
+        return hash_bytes(*parts)
+
+    def is_fresh(self, from_path: str, digest: str, dest_path: str) -> bool:
+        self.seen.add(from_path)
+        entry = self.pages.get(from_path)
+        if entry is None or entry["hash"] != digest or entry["output"] != dest_path:
+            return False
+        # Full builds, --changed and serve rewrite outputs without this
+        # manifest, so the output must still be the file recorded here
+        try:
+            stat = os.stat(dest_path)
+        except FileNotFoundError:
+            return False
+        return entry.get("output_size") == stat.st_size and entry.get("output_mtime_ns") == stat.st_mtime_ns
+
+    def record(self, from_path: str, source_hash: str, digest: str, dest_path: str):
+        # Called once dest_path has been written
+        stat = os.stat(from_path)
+        output_stat = os.stat(dest_path)
+        self.seen.add(from_path)
+        previous = self.pages.get(from_path)
+        if previous and previous["output"] != dest_path and os.path.exists(previous["output"]):
+            os.remove(previous["output"])
+        self.pages[from_path] = {
+            "source_hash": source_hash,
+            "hash": digest,
+            "output": dest_path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "output_size": output_stat.st_size,
+            "output_mtime_ns": output_stat.st_mtime_ns,
+        }
+
+    def prune(self) -> list:
+        # Remove outputs whose sources were not visited during this build
+        removed = []
+        for from_path in sorted(set(self.pages) - self.seen):
+            output = self.pages.pop(from_path)["output"]
+            if os.path.exists(output):
+                os.remove(output)
+                removed.append(output)
+        return removed
@@ -0,0 +1,98 @@
+import re
+
+# Whitespace inside these elements is significant and is left untouched
+PRESERVE_WHITESPACE = frozenset(("pre", "code", "textarea", "script", "style"))
+# Elements whose surrounding whitespace never renders, so it can be dropped
+# entirely instead of collapsed to one space
+BLOCK_ELEMENTS = frozenset((
+    "html", "head", "body", "title", "meta", "link", "base", "script", "style", "noscript",
+    "div", "p", "article", "section", "header", "footer", "nav", "main", "aside",
+    "ul", "ol", "li", "dl", "dt", "dd", "h1", "h2", "h3", "h4", "h5", "h6",
+    "table", "thead", "tbody", "tfoot", "tr", "td", "th", "blockquote", "pre", "hr", "br",
+    "form", "fieldset", "figure", "figcaption", "!doctype",
+))
+
+WHITESPACE_RUN = re.compile(r"[ \t\n\r\f]{2,}|[\t\n\r\f]")
+# An attribute value that needs no quotes: no whitespace, quotes, = < > or
+# backtick, and not ending in "/" (which would read as a self-closing slash)
+UNQUOTED_VALUE = re.compile(r"[^\s\"'=<>`]*[^\s\"'=<>`/]")
+TOKEN = re.compile(r"<!--.*?-->|<[^>]*>|[^<]+|<", re.S)
+TAG_NAME = re.compile(r"</?\s*([^\s/>]+)")
+ATTRIBUTE = re.compile(r"""(\s+)([^\s"'>/=]+)(\s*=\s*)("[^"]*"|'[^']*')""")
+
+
+def collapse_whitespace(text: str) -> str:
+    # Called on every text leaf; most have nothing to collapse, and the
+    # substring checks are much cheaper than running the regex
+    if "  " in text or "\n" in text or "\t" in text or "\r" in text or "\f" in text:
+        return WHITESPACE_RUN.sub(" ", text)
+    return text
+
+
+def attribute(name: str, value: str, minify: bool = False) -> str:
+    if minify and UNQUOTED_VALUE.fullmatch(value):
+        return f" {name}={value}"
+    return f' {name}="{value}"'
+
+
+def _minify_tag(tag: str) -> str:
+    def unquote(match):
+        value = match.group(4)[1:-1]
+        if UNQUOTED_VALUE.fullmatch(value):
+            return f" {match.group(2)}={value}"
+        return f" {match.group(2)}={match.group(4)}"
+    return ATTRIBUTE.sub(unquote, tag)
+
+
+def minify_html(html: str) -> str:
+    # For hand-written HTML such as the page template: drops comments (but not
+    # conditional comments), collapses whitespace between and around tags,
+    # and unquotes attribute values where that is safe. Text inside
+    # PRESERVE_WHITESPACE elements is copied verbatim.
+    tokens = TOKEN.findall(html)
+    out = []
+    preserve = None
+    for i, token in enumerate(tokens):
+        if preserve is not None:
+            out.append(token)
+            if token.startswith("</") and _tag_name(token) == preserve:
+                preserve = None
+            continue
+        if token.startswith("<!--"):
+            if token.startswith("<!--[if"):
+                out.append(token)
+            continue
+        if token.startswith("<") and len(token) > 1:
+            out.append(_minify_tag(token))
+            name = _tag_name(token)
+            if name in PRESERVE_WHITESPACE and not token.startswith("</") and not token.endswith("/>"):
+                preserve = name
+            continue
+        text = collapse_whitespace(token)
+        if text == " ":
+            # Whitespace-only: it only matters between two inline neighbours
+            before = _tag_name(out[-1]) if out and out[-1].startswith("<") else None
+            after = _next_tag(tokens, i)
+            if not out or after is None or before in BLOCK_ELEMENTS or after in BLOCK_ELEMENTS:
+                continue
+        else:
+            if not out or out[-1].startswith("<") and _tag_name(out[-1]) in BLOCK_ELEMENTS:
+                text = text.lstrip(" ")
+            after = _next_tag(tokens, i)
+            if after is None or after in BLOCK_ELEMENTS:
+                text = text.rstrip(" ")
+        out.append(text)
+    return "".join(out)
+
+
+def _tag_name(token: str) -> str:
+    match = TAG_NAME.match(token)
+    return match.group(1).lower() if match else None
+
+
+def _next_tag(tokens: list, i: int) -> str:
+    for token in tokens[i + 1:]:
+        if token.startswith("<!--"):
+            continue
+        return _tag_name(token) if token.startswith("<") else ""
+    return None
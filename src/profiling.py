@@ -0,0 +1,168 @@
+import contextlib
+import functools
+import json
+import time
+
+# Stage timings are exclusive: entering a nested stage pauses the enclosing one,
+# so the stage totals add up to the instrumented wall time.
+
+_active = None
+_noop = contextlib.nullcontext()
+
+
+class BuildProfiler():
+    # helper functions wrapped while profiling; they run per block, so they are
+    # instrumented by wrapping instead of carrying a stage() call permanently
+    WRAPPED = (
+        ("markdown_to_typed_blocks", "markdown_to_blocks"),
+        ("text_to_textnodes", "text_to_textnodes"),
+    )
+
+    def __init__(self, trace: bool = False):
+        self.stages = {}
+        self.pages = []
+        self.trace_events = [] if trace else None
+        self._stack = []
+        self._page = None
+        self._originals = {}
+        self._origin = time.perf_counter()
+
+    def _clock(self) -> tuple:
+        return time.perf_counter(), time.process_time()
+
+    def _charge(self, name: str, wall: float, cpu: float):
+        totals = self.stages.setdefault(name, [0, 0.0, 0.0])
+        totals[1] += wall
+        totals[2] += cpu
+        if self._page is not None:
+            page_totals = self._page["stages"].setdefault(name, [0.0, 0.0])
+            page_totals[0] += wall
+            page_totals[1] += cpu
+
+    @contextlib.contextmanager
+    def stage(self, name: str, trace: bool = False):
+        now = self._clock()
+        if self._stack:
+            parent = self._stack[-1]
+            self._charge(parent[0], now[0] - parent[1], now[1] - parent[2])
+        self.stages.setdefault(name, [0, 0.0, 0.0])[0] += 1
+        frame = [name, now[0], now[1]]
+        self._stack.append(frame)
+        start = now[0]
+        try:
+            yield
+        finally:
+            end = self._clock()
+            self._charge(name, end[0] - frame[1], end[1] - frame[2])
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][1], self._stack[-1][2] = end
+            if trace and self.trace_events is not None:
+                self._trace(name, start, end[0], "stage")
+
+    @contextlib.contextmanager
+    def page(self, path: str):
+        wall, cpu = self._clock()
+        self._page = {"path": path, "stages": {}}
+        try:
+            yield
+        finally:
+            end_wall, end_cpu = self._clock()
+            self._page["wall"] = end_wall - wall
+            self._page["cpu"] = end_cpu - cpu
+            self.pages.append(self._page)
+            self._page = None
+            if self.trace_events is not None:
+                self._trace(path, wall, end_wall, "page")
+
+    def _trace(self, name: str, start: float, end: float, category: str):
+        self.trace_events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((start - self._origin) * 1e6, 1),
+            "dur": round((end - start) * 1e6, 1),
+            "pid": 0,
+            "tid": 0,
+        })
+
+    def _wrap(self, func, name: str):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def activate(self):
+        global _active
+        import helper
+        for attr, name in self.WRAPPED:
+            self._originals[attr] = getattr(helper, attr)
+            setattr(helper, attr, self._wrap(self._originals[attr], name))
+        _active = self
+
+    def deactivate(self):
+        global _active
+        import helper
+        for attr, func in self._originals.items():
+            setattr(helper, attr, func)
+        self._originals = {}
+        _active = None
+
+    def __enter__(self):
+        self.activate()
+        return self
+
+    def __exit__(self, *exc):
+        self.deactivate()
+
+    def summary(self, top: int = 10) -> str:
+        lines = []
+        total_wall = sum(wall for _, wall, _ in self.stages.values()) or 1e-12
+        lines.append(f"{'stage':<20} {'calls':>8} {'wall ms':>10} {'cpu ms':>10} {'share':>7}")
+        for name, (calls, wall, cpu) in sorted(self.stages.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:<20} {calls:>8} {wall * 1000:>10.2f} {cpu * 1000:>10.2f} {wall / total_wall:>6.1%}")
+        if self.pages:
+            lines.append("")
+            lines.append(f"Slowest {min(top, len(self.pages))} of {len(self.pages)} pages:")
+            lines.append(f"{'wall ms':>10} {'cpu ms':>10}  page")
+            for page in sorted(self.pages, key=lambda page: -page["wall"])[:top]:
+                lines.append(f"{page['wall'] * 1000:>10.2f} {page['cpu'] * 1000:>10.2f}  {page['path']}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        return {
+            "stages": {name: {"calls": calls, "wall": wall, "cpu": cpu} for name, (calls, wall, cpu) in self.stages.items()},
+            "pages": [
+                {
+                    "path": page["path"],
+                    "wall": page["wall"],
+                    "cpu": page["cpu"],
+                    "stages": {name: {"wall": wall, "cpu": cpu} for name, (wall, cpu) in page["stages"].items()},
+                }
+                for page in self.pages
+            ],
+        }
+
+    def write_trace(self, path: str):
+        # Chrome trace-event format (chrome://tracing, Perfetto) plus the aggregated timings
+        data = self.to_dict()
+        data["traceEvents"] = self.trace_events or []
+        with open(path, "w") as f:
+            json.dump(data, f, indent=1)
+
+
+def active() -> bool:
+    return _active is not None
+
+
+def stage(name: str):
+    if _active is None:
+        return _noop
+    return _active.stage(name, trace=True)
+
+
+def page(path: str):
+    if _active is None:
+        return _noop
+    return _active.page(path)
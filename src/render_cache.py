@@ -0,0 +1,130 @@
+import hashlib
+import os
+
+# Bump when block rendering changes in a way the source hash below cannot see
+RENDERER_VERSION = 1
+DEFAULT_CACHE_PATH = "./.cache/render-cache.sqlite"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def renderer_version() -> str:
+    # Any edit to the modules that turn a block into HTML invalidates the cache
+    import helper
+    import htmlnode
+    import images
+    import minify
+    import textnode
+    digest = hashlib.sha256(str(RENDERER_VERSION).encode())
+    for module in (helper, htmlnode, textnode, minify, images):
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def block_key(block: str) -> str:
+    return hashlib.blake2b(block.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class RenderCache():
+    # Maps block text to its rendered HTML fragment. Lookups and inserts are
+    # buffered in memory and written by flush(); eviction is least recently used
+    # by a persisted access tick, down to 90% of max_bytes.
+    def __init__(self, path: str = None, max_bytes: int = DEFAULT_MAX_BYTES, version: str = None):
+        self.path = path or DEFAULT_CACHE_PATH
+        self.max_bytes = max_bytes
+        self.version = version or renderer_version()
+        self.hits = 0
+        self.misses = 0
+        self._pending = {}
+        self._touched = {}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Imported here: most builds run without the cache
+        import sqlite3
+        self._db = sqlite3.connect(self.path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS blocks (key TEXT PRIMARY KEY, html TEXT, size INTEGER, used INTEGER)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS blocks_used ON blocks (used)")
+        if self._meta("version") != self.version:
+            self.clear()
+        self._tick = int(self._meta("tick") or 0)
+
+    def _meta(self, key: str) -> str:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def clear(self):
+        with self._db:
+            self._db.execute("DELETE FROM blocks")
+            self._set_meta("version", self.version)
+            self._set_meta("tick", "0")
+        self._pending = {}
+        self._touched = {}
+
+    def get(self, block: str) -> str:
+        key = block_key(block)
+        html = self._pending.get(key)
+        if html is None:
+            row = self._db.execute("SELECT html FROM blocks WHERE key = ?", (key,)).fetchone()
+            html = row[0] if row else None
+        if html is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._tick += 1
+        self._touched[key] = self._tick
+        return html
+
+    def put(self, block: str, html: str):
+        key = block_key(block)
+        self._tick += 1
+        self._pending[key] = html
+        self._touched[key] = self._tick
+
+    def flush(self):
+        if not self._pending and not self._touched:
+            return
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO blocks (key, html, size, used) VALUES (?, ?, ?, ?)",
+                [(key, html, len(html), self._touched[key]) for key, html in self._pending.items()],
+            )
+            self._db.executemany(
+                "UPDATE blocks SET used = MAX(used, ?) WHERE key = ?",
+                [(used, key) for key, used in self._touched.items() if key not in self._pending],
+            )
+            # Concurrent writers (worker processes) share the tick; keep the largest
+            stored = int(self._meta("tick") or 0)
+            self._tick = max(self._tick, stored)
+            self._set_meta("tick", str(self._tick))
+        self._pending = {}
+        self._touched = {}
+
+    def size(self) -> int:
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blocks").fetchone()[0]
+
+    def evict(self) -> int:
+        self.flush()
+        total = self.size()
+        if total <= self.max_bytes:
+            return 0
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key, size in self._db.execute("SELECT key, size FROM blocks ORDER BY used"):
+            if freed >= target:
+                break
+            victims.append((key,))
+            freed += size
+        with self._db:
+            self._db.executemany("DELETE FROM blocks WHERE key = ?", victims)
+        return len(victims)
+
+    def close(self):
+        self.evict()
+        self._db.close()
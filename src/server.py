@@ -0,0 +1,264 @@
+import argparse
+import functools
+import os
+import shutil
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from helper import generate_page
+
+RELOAD_PATH = "/__livereload"
+RELOAD_SCRIPT = (
+    "<script>new EventSource(\"" + RELOAD_PATH + "\")"
+    ".onmessage = function () { location.reload(); };</script>"
+)
+
+
+def snapshot(root: str) -> dict:
+    # path -> (mtime_ns, size) for every file under root (or root itself if it is a file)
+    if os.path.isfile(root):
+        stat = os.stat(root)
+        return {root: (stat.st_mtime_ns, stat.st_size)}
+    files = {}
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_dir():
+                stack.append(entry.path)
+            elif entry.is_file():
+                stat = entry.stat()
+                files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def diff_snapshots(old: dict, new: dict) -> tuple:
+    changed = sorted(path for path, stat in new.items() if old.get(path) != stat)
+    removed = sorted(path for path in old if path not in new)
+    return changed, removed
+
+
+class ReloadHub():
+    # Connected SSE clients wait on the condition until the version moves on
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version: int, timeout: float) -> int:
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+class Rebuilder():
+    def __init__(self, basepath: str, content_dir: str, template_path: str, static_dir: str, dest_dir: str):
+        self.basepath = basepath
+        self.content_dir = content_dir
+        self.template_path = template_path
+        self.static_dir = static_dir
+        self.dest_dir = dest_dir
+
+    def page_dest_path(self, from_path: str) -> str:
+        rel_path = os.path.relpath(from_path, self.content_dir)
+        directory, file = os.path.split(rel_path)
+        return os.path.join(self.dest_dir, directory, file.replace(".md", ".html"))
+
+    def static_dest_path(self, path: str) -> str:
+        return os.path.join(self.dest_dir, os.path.relpath(path, self.static_dir))
+
+    def build_page(self, from_path: str):
+        dest_path = self.page_dest_path(from_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        generate_page(self.basepath, from_path, self.template_path, dest_path)
+
+    def is_page(self, path: str) -> bool:
+        return path.endswith(".md") and _is_within(path, self.content_dir)
+
+    def is_static(self, path: str) -> bool:
+        return _is_within(path, self.static_dir)
+
+    def apply(self, changed: list, removed: list) -> int:
+        # Rebuild only what the changed paths affect; returns the number of outputs touched
+        touched = 0
+        if self.template_path in changed:
+            # Every page is rendered through the template
+            pages = sorted(path for path in snapshot(self.content_dir) if path.endswith(".md"))
+        else:
+            pages = [path for path in changed if self.is_page(path)]
+        for from_path in pages:
+            self.build_page(from_path)
+            touched += 1
+        for path in changed:
+            if self.is_static(path):
+                dest_path = self.static_dest_path(path)
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                shutil.copy2(path, dest_path)
+                touched += 1
+        for path in removed:
+            if self.is_page(path):
+                dest_path = self.page_dest_path(path)
+            elif self.is_static(path):
+                dest_path = self.static_dest_path(path)
+            else:
+                continue
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+                touched += 1
+        return touched
+
+
+def _is_within(path: str, directory: str) -> bool:
+    return os.path.commonpath([os.path.abspath(path), os.path.abspath(directory)]) == os.path.abspath(directory)
+
+
+class Watcher(threading.Thread):
+    def __init__(self, paths: list, rebuilder: Rebuilder, hub: ReloadHub, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.paths = paths
+        self.rebuilder = rebuilder
+        self.hub = hub
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.state = self.scan()
+
+    def scan(self) -> dict:
+        files = {}
+        for path in self.paths:
+            if os.path.exists(path):
+                files.update(snapshot(path))
+        return files
+
+    def poll(self) -> bool:
+        state = self.scan()
+        changed, removed = diff_snapshots(self.state, state)
+        self.state = state
+        if not changed and not removed:
+            return False
+        start = time.perf_counter()
+        try:
+            touched = self.rebuilder.apply(changed, removed)
+        except Exception as e:
+            print(f"Rebuild failed: {type(e).__name__}: {e}", file=sys.stderr)
+            return False
+        print(f"Rebuilt {touched} file(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+        self.hub.notify()
+        return True
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.poll()
+
+    def stop(self):
+        self.stopped.set()
+
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    hub = None
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            self.send_events()
+            return
+        if self.hub is not None:
+            path = self.translate_path(self.path)
+            # Directories without a trailing slash fall through to the base redirect
+            if os.path.isdir(path) and self.path.split("?", 1)[0].endswith("/"):
+                path = os.path.join(path, "index.html")
+            if path.endswith(".html") and os.path.isfile(path):
+                self.send_html(path)
+                return
+        super().do_GET()
+
+    def send_html(self, path: str):
+        with open(path, "rb") as f:
+            body = f.read()
+        marker = body.rfind(b"</body>")
+        script = RELOAD_SCRIPT.encode("utf-8")
+        body = body[:marker] + script + body[marker:] if marker != -1 else body + script
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self):
+        if self.hub is None:
+            self.send_error(404, "Live reload is only available with --watch")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        version = self.hub.version
+        try:
+            while True:
+                new_version = self.hub.wait(version, 15)
+                if new_version == version:
+                    self.wfile.write(b": keepalive\n\n")
+                else:
+                    version = new_version
+                    self.wfile.write(b"data: reload\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        if self.path != RELOAD_PATH:
+            super().log_message(format, *args)
+
+
+def parse_args(argv: list):
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Build the site and serve ./docs")
+    parser.add_argument("basepath", nargs="?", default="/", help="base path prepended to root-relative links")
+    parser.add_argument("--watch", action="store_true", help="rebuild changed pages and live-reload browsers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between file system polls")
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None):
+    from main import build, parse_args as parse_build_args
+
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    content_dir, template_path, static_dir, dest_dir = "./content", "./template.html", "./public", "./docs"
+    # A regular build: unchanged outputs keep their mtimes, and the build
+    # manifest and dependency graph stay in step with docs/
+    build(parse_build_args([args.basepath]))
+
+    hub = None
+    watcher = None
+    if args.watch:
+        hub = ReloadHub()
+        rebuilder = Rebuilder(args.basepath, content_dir, template_path, static_dir, dest_dir)
+        watcher = Watcher([content_dir, template_path, static_dir], rebuilder, hub, args.interval)
+        watcher.start()
+
+    handler = functools.partial(type("Handler", (LiveReloadHandler,), {"hub": hub}), directory=dest_dir)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    print(f"Serving {dest_dir} on http://{args.host}:{args.port}/" + (" (watching for changes)" if args.watch else ""))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import hashlib
+import json
+import os
+
+from fileio import file_digest, save_json
+
+SHARD_VERSION = 1
+SHARD_MANIFEST = "shard-manifest.json"
+
+
+def parse_shard(value: str) -> tuple:
+    # "2/4" -> (2, 4); shards are numbered from 1
+    k, _, n = value.partition("/")
+    try:
+        k, n = int(k), int(n)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected K/N, got {value!r}")
+    if n < 1 or not 1 <= k <= n:
+        raise argparse.ArgumentTypeError(f"shard {k}/{n} out of range: need 1 <= K <= N")
+    return k, n
+
+
+def shard_of(rel_path: str, shards: int) -> int:
+    # Depends only on the source path relative to the content root, so every
+    # machine agrees on the split and adding a page never moves the others
+    key = rel_path.replace(os.sep, "/").encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big") % shards + 1
+
+
+def select_shard(pages: list, content_dir: str, shard: tuple) -> list:
+    k, n = shard
+    return [(from_path, dest_path) for from_path, dest_path in pages
+            if shard_of(os.path.relpath(from_path, content_dir), n) == k]
+
+
+def _remap(path: str, shard_dir: str, dest_dir: str) -> str:
+    # Paths inside the shard directory become the matching path in the final tree
+    rel_path = os.path.relpath(path, shard_dir)
+    if rel_path == os.pardir or rel_path.startswith(os.pardir + os.sep):
+        return path
+    return os.path.normpath(os.path.join(dest_dir, rel_path))
+
+
+def write_shard_manifest(shard_dir: str, shard: tuple, basepath: str, graph, dest_dir: str, options: dict = None, assets=None, images: str = None) -> dict:
+    # Lists every page the shard rendered (with a digest, so the merge can spot
+    # damaged transfers) and its dependency graph entry in final docs/ paths
+    files = {}
+    deps = {}
+    for output, node in graph.nodes.items():
+        rel_path = os.path.relpath(output, shard_dir).replace(os.sep, "/")
+        files[rel_path] = file_digest(output)
+        deps[rel_path] = [_remap(path, shard_dir, dest_dir) for path in node["inputs"]]
+    manifest = {
+        "version": SHARD_VERSION,
+        "shard": shard[0],
+        "shards": shard[1],
+        "basepath": basepath,
+        "options": options or {},
+        "assets": assets.urls if assets is not None else {},
+        "images": images,
+        "files": files,
+        "deps": deps,
+    }
+    save_json(os.path.join(shard_dir, SHARD_MANIFEST), manifest)
+    return manifest
+
+
+def load_shard_manifest(shard_dir: str) -> dict:
+    path = os.path.join(shard_dir, SHARD_MANIFEST)
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"{shard_dir} is not a shard output: {e}")
+    if manifest.get("version") != SHARD_VERSION:
+        raise ValueError(f"{path}: unsupported shard manifest version {manifest.get('version')}")
+    return manifest
+
+
+def check_shards(manifests: dict, static_files: set) -> list:
+    # Returns the problems that make the shards unsafe to merge: mixed builds,
+    # missing or duplicate shards, and outputs claimed by more than one source
+    problems = []
+    first = next(iter(manifests.values()))
+    for shard_dir, manifest in manifests.items():
+        for key in ("shards", "basepath", "options", "assets", "images"):
+            if manifest.get(key) != first.get(key):
+                problems.append(f"{shard_dir}: {key} {manifest.get(key)!r} does not match {first.get(key)!r}")
+    if problems:
+        return problems
+
+    owners = {}
+    for shard_dir, manifest in manifests.items():
+        owners.setdefault(manifest["shard"], []).append(shard_dir)
+    for k, dirs in sorted(owners.items()):
+        if len(dirs) > 1:
+            problems.append(f"shard {k}/{first['shards']} given more than once: {', '.join(dirs)}")
+    missing = sorted(set(range(1, first["shards"] + 1)) - set(owners))
+    if missing:
+        problems.append(f"missing shard(s) {', '.join(str(k) for k in missing)} of {first['shards']}")
+
+    claimed = {rel_path: ["static assets"] for rel_path in static_files}
+    for shard_dir, manifest in manifests.items():
+        for rel_path in manifest["files"]:
+            claimed.setdefault(rel_path, []).append(shard_dir)
+    for rel_path, sources in sorted(claimed.items()):
+        if len(sources) > 1:
+            problems.append(f"collision on {rel_path}: {', '.join(sources)}")
+    return problems
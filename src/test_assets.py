@@ -0,0 +1,119 @@
+import os
+import unittest
+from unittest import mock
+
+from assets import AssetManifest, asset_manifest, sync_static
+from fileio import file_digest
+from testutil import SiteTestCase
+
+
+class TestSyncStatic(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.source = os.path.join(self.root, "public")
+        self.target = os.path.join(self.root, "docs")
+        self.state = os.path.join(self.root, "state.json")
+        os.makedirs(os.path.join(self.source, "images"))
+        self.write(os.path.join(self.source, "index.css"), "body {}")
+        self.write(os.path.join(self.source, "images", "a.png"), "png-bytes")
+
+    def sync(self, **kwargs):
+        return sync_static(self.source, self.target, self.state, **kwargs)
+
+    def transferred(self, stats):
+        return stats["copied"] + stats["linked"] + stats["reflinked"]
+
+    def test_first_sync_copies_everything(self):
+        stats = self.sync()
+        self.assertEqual(self.transferred(stats), 2)
+        self.assertEqual(self.read(os.path.join(self.target, "images", "a.png")), "png-bytes")
+        self.assertEqual(os.stat(os.path.join(self.target, "index.css")).st_mtime_ns,
+                         os.stat(os.path.join(self.source, "index.css")).st_mtime_ns)
+
+    def test_noop_sync_copies_nothing(self):
+        self.sync()
+        with mock.patch("assets.transfer_file") as transfer:
+            stats = self.sync()
+        transfer.assert_not_called()
+        self.assertEqual(stats["unchanged"], 2)
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        css = os.path.join(self.source, "index.css")
+        self.write(css, "body { color: red }")
+        stats = self.sync()
+        self.assertEqual((self.transferred(stats), stats["unchanged"]), (1, 1))
+        self.assertEqual(self.read(os.path.join(self.target, "index.css")), "body { color: red }")
+
+    def test_checksum_skips_touched_but_identical_file(self):
+        self.sync()
+        css = os.path.join(self.source, "index.css")
+        stat = os.stat(css)
+        os.utime(css, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+        stats = self.sync(checksum=True)
+        self.assertEqual(self.transferred(stats), 0)
+        self.assertEqual(os.stat(os.path.join(self.target, "index.css")).st_mtime_ns, stat.st_mtime_ns + 5_000_000_000)
+        os.utime(css, ns=(stat.st_atime_ns, stat.st_mtime_ns + 9_000_000_000))
+        self.assertEqual(self.transferred(self.sync()), 1)
+
+    def test_orphans_removed_but_pages_kept(self):
+        self.sync()
+        page = os.path.join(self.target, "index.html")
+        self.write(page, "<html></html>")
+        os.remove(os.path.join(self.source, "images", "a.png"))
+        os.rmdir(os.path.join(self.source, "images"))
+        stats = self.sync()
+        self.assertEqual(stats["removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.target, "images")))
+        self.assertTrue(os.path.exists(page))
+
+    def test_hardlink(self):
+        stats = self.sync(hardlink=True)
+        self.assertEqual(stats["linked"], 2)
+        self.assertTrue(os.path.samefile(os.path.join(self.source, "index.css"), os.path.join(self.target, "index.css")))
+        self.assertEqual(self.sync(hardlink=True)["unchanged"], 2)
+
+    def test_hardlink_falls_back_to_copy(self):
+        with mock.patch("os.link", side_effect=OSError("cross-device link")):
+            stats = self.sync(hardlink=True)
+        self.assertEqual(stats["copied"], 2)
+
+    def test_transfer_leaves_no_temp_file(self):
+        self.sync()
+        self.assertEqual(sorted(os.listdir(self.target)), ["images", "index.css"])
+
+    def test_file_digest(self):
+        import hashlib
+        self.assertEqual(file_digest(os.path.join(self.source, "index.css")), hashlib.sha256(b"body {}").hexdigest())
+
+    def test_fingerprinted_copies(self):
+        hashes = os.path.join(self.root, "hashes.json")
+        self.write(os.path.join(self.source, "robots.txt"), "")
+        assets = asset_manifest(self.source, hashes)
+        css = "/index." + file_digest(os.path.join(self.source, "index.css"))[:10] + ".css"
+        self.assertEqual(sorted(assets.urls), ["/images/a.png", "/index.css"])
+        self.assertEqual(assets.urls["/index.css"], css)
+        self.assertEqual(self.transferred(self.sync(assets=assets)), 5)
+        self.assertEqual(self.read(self.target + css), "body {}")
+        self.assertTrue(os.path.exists(os.path.join(self.target, "index.css")))
+
+        # A changed asset gets a new fingerprint and the old copy is removed
+        self.write(os.path.join(self.source, "index.css"), "body { margin: 0 }")
+        changed = asset_manifest(self.source, hashes)
+        self.assertNotEqual(changed.urls["/index.css"], css)
+        self.assertNotEqual(changed.digest, assets.digest)
+        self.assertEqual(changed.urls["/images/a.png"], assets.urls["/images/a.png"])
+        stats = self.sync(assets=changed)
+        self.assertEqual((self.transferred(stats), stats["removed"]), (2, 1))
+        self.assertFalse(os.path.exists(self.target + css))
+
+    def test_asset_manifest_resolve(self):
+        assets = AssetManifest({"/index.css": "/index.abc.css"})
+        self.assertEqual(assets.resolve("/index.css"), "/index.abc.css")
+        self.assertEqual(assets.resolve("/index.css?v=2#top"), "/index.abc.css?v=2#top")
+        self.assertEqual(assets.resolve("/other.css"), "/other.css")
+        self.assertEqual(assets, AssetManifest({"/index.css": "/index.abc.css"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
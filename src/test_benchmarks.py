@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks.corpus import CorpusGenerator, parse_mix
+from benchmarks.runner import compare
+from helper import markdown_to_html_node, extract_title
+
+
+class TestCorpusGenerator(unittest.TestCase):
+    def test_deterministic(self):
+        self.assertEqual(CorpusGenerator(7).page(3), CorpusGenerator(7).page(3))
+        self.assertNotEqual(CorpusGenerator(7).page(3), CorpusGenerator(8).page(3))
+
+    def test_pages_are_valid_markdown(self):
+        generator = CorpusGenerator(1, blocks_per_page=40, links=0.3, images=0.1)
+        for index in range(50):
+            markdown = generator.page(index)
+            self.assertTrue(extract_title(markdown).startswith(f"Page {index}:"))
+            markdown_to_html_node(markdown).to_html()
+
+    def test_mix_limits_block_kinds(self):
+        page = CorpusGenerator(1, {"code": 1}, blocks_per_page=5).page(0)
+        blocks = page.strip().split("\n\n")
+        self.assertEqual(len(blocks), 6)
+        self.assertTrue(all(block.startswith("```") for block in blocks[1:]))
+
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix("paragraph=5,code=1"), {"paragraph": 5.0, "code": 1.0})
+        with self.assertRaises(Exception):
+            parse_mix("table=1")
+
+    def test_write_layout(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content_dir = CorpusGenerator(1, blocks_per_page=2).write(tmp, 5, per_dir=2)
+            self.assertEqual(sorted(os.listdir(content_dir)), ["s0000", "s0001", "s0002"])
+            self.assertEqual(sorted(os.listdir(os.path.join(content_dir, "s0001"))), ["page000002.md", "page000003.md"])
+            self.assertTrue(os.path.exists(os.path.join(tmp, "template.html")))
+
+
+class TestBenchmarkCompare(unittest.TestCase):
+    def test_compare(self):
+        baseline = {"pages_per_sec": 100.0, "stages": {"parse": 1.0, "write": 0.5}}
+        self.assertEqual(compare({"pages_per_sec": 95.0, "stages": {"parse": 1.05}}, baseline, 0.1), [])
+        regressions = compare({"pages_per_sec": 80.0, "stages": {"parse": 1.5, "new": 9.0}}, baseline, 0.1)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("pages/sec"))
+        self.assertTrue(regressions[1].startswith("parse"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import gzip
+import os
+import unittest
+
+import compress
+from compress import precompress, precompress_file
+from testutil import SiteTestCase
+
+HTML = "<html><body>" + "<p>The road goes ever on and on</p>" * 100 + "</body></html>"
+
+
+class TestPrecompress(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = self.write("index.html", HTML)
+
+    def test_writes_matching_deterministic_gzip(self):
+        stats = precompress_file(self.path)
+        self.assertEqual(stats["compressed"], len(compress.encodings()))
+        with gzip.open(self.path + ".gz", "rt") as f:
+            self.assertEqual(f.read(), HTML)
+        with open(self.path + ".gz", "rb") as f:
+            first = f.read()
+        os.remove(self.path + ".gz")
+        precompress_file(self.path)
+        with open(self.path + ".gz", "rb") as f:
+            self.assertEqual(f.read(), first)
+
+    def test_unchanged_output_is_skipped(self):
+        precompress_file(self.path)
+        self.assertEqual(precompress_file(self.path)["unchanged"], len(compress.encodings()))
+        self.write("index.html", HTML.replace("road", "path"))
+        os.utime(self.path, ns=(1, 1))
+        self.assertEqual(precompress_file(self.path)["compressed"], len(compress.encodings()))
+        with gzip.open(self.path + ".gz", "rt") as f:
+            self.assertIn("path goes", f.read())
+
+    def test_threshold_and_incompressible_files(self):
+        precompress_file(self.path)
+        self.write("index.html", "<p>tiny</p>")
+        stats = precompress_file(self.path)
+        self.assertEqual((stats["skipped"], stats["removed"]), (1, len(compress.encodings())))
+        self.assertFalse(os.path.exists(self.path + ".gz"))
+        noise = self.write("noise.txt", "".join(chr(33 + (i * 7919) % 90) for i in range(300)))
+        self.assertEqual(precompress_file(noise, min_size=0)["compressed"], len(compress.encodings()))
+        random_bytes = os.path.join(self.root, "random.js")
+        with open(random_bytes, "wb") as f:
+            f.write(os.urandom(4096))
+        self.assertEqual(precompress_file(random_bytes)["skipped"], len(compress.encodings()))
+        self.assertFalse(os.path.exists(random_bytes + ".gz"))
+
+    def test_precompress_selects_text_outputs(self):
+        css = self.write("index.css", "body { margin: 0 } " * 100)
+        png = self.write("image.png", "not text " * 200)
+        stats, siblings = precompress([self.path, css, png, self.path + ".missing"], jobs=2)
+        self.assertEqual(stats["compressed"], 2 * len(compress.encodings()))
+        self.assertIn(self.path + ".gz", siblings)
+        self.assertIn(css + ".gz", siblings)
+        self.assertFalse(os.path.exists(png + ".gz"))
+
+    @unittest.skipUnless(compress.brotli_module() is not None, "brotli module not installed")
+    def test_brotli_sibling(self):
+        precompress_file(self.path)
+        with open(self.path + ".br", "rb") as f:
+            self.assertEqual(compress.brotli_module().decompress(f.read()).decode(), HTML)
+
+
+if __name__ == "__main__":
+    unittest.main()
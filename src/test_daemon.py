@@ -0,0 +1,90 @@
+import io
+import os
+import threading
+import time
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+
+import daemon
+from daemon import BuildDaemon, request
+from testutil import TEMPLATE, SiteTestCase
+
+
+class TestBuildDaemon(SiteTestCase):
+    chdir = True
+
+    def setUp(self):
+        super().setUp()
+        os.makedirs("content")
+        os.makedirs("public")
+        self.write("template.html", TEMPLATE)
+        self.write(os.path.join("content", "index.md"), "# Home\n\nHello")
+        self.socket_path = os.path.join(".cache", "build.sock")
+        self.thread = None
+
+    def tearDown(self):
+        if self.thread is not None and self.thread.is_alive():
+            request({"stop": True}, self.socket_path)
+            self.thread.join(5)
+
+    def start(self):
+        server = BuildDaemon(self.socket_path)
+        self.thread = threading.Thread(target=server.serve, daemon=True)
+        with redirect_stdout(io.StringIO()):
+            self.thread.start()
+            deadline = time.monotonic() + 5
+            while not os.path.exists(self.socket_path) and time.monotonic() < deadline:
+                time.sleep(0.01)
+        return server
+
+    def build(self, argv):
+        return request({"argv": argv, "cwd": os.getcwd()}, self.socket_path)
+
+    def test_builds_stay_incremental(self):
+        self.start()
+        reply = self.build([])
+        self.assertEqual(reply["status"], 0)
+        self.assertIn("Outputs: 1 written", reply["output"])
+        self.write(os.path.join("content", "index.md"), "# Home\n\nChanged")
+        reply = self.build([])
+        self.assertIn("Outputs: 1 written", reply["output"])
+        with open(os.path.join("docs", "index.html")) as f:
+            self.assertIn("Changed", f.read())
+        reply = self.build([])
+        self.assertIn("Outputs: 0 written, 1 unchanged", reply["output"])
+
+    def test_errors_are_reported(self):
+        self.start()
+        reply = self.build(["--no-such-flag"])
+        self.assertEqual(reply["status"], 2)
+        self.assertIn("unrecognized arguments", reply["output"])
+        self.assertEqual(self.build(["serve"])["status"], 2)
+        reply = request({"argv": [], "cwd": os.path.dirname(self.root)}, self.socket_path)
+        self.assertEqual(reply["status"], 2)
+        self.assertEqual(self.build([])["status"], 0)
+
+    def test_render_cache_stays_open(self):
+        server = self.start()
+        self.build(["--render-cache"])
+        cache = next(iter(server.caches.values()))
+        reply = self.build(["--render-cache"])
+        self.assertIs(next(iter(server.caches.values())), cache)
+        self.assertIn("Render cache: 2 hits, 0 misses", reply["output"])
+
+    def test_stop(self):
+        self.start()
+        self.assertEqual(request({"stop": True}, self.socket_path)["output"], "Build daemon stopped\n")
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_client_builds_locally_without_daemon(self):
+        with redirect_stdout(io.StringIO()) as out, redirect_stderr(io.StringIO()) as err:
+            status = daemon.main(["--socket", self.socket_path])
+        self.assertEqual(status, 0)
+        self.assertIn("No build daemon", err.getvalue())
+        self.assertIn("Outputs: 1 written", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import main
+from deps import DependencyGraph, reference_to_path
+from testutil import SiteTestCase
+
+TEMPLATE = '<html><link href="/index.css"><body>{{ Content }}</body></html>'
+
+
+class TestReferenceToPath(unittest.TestCase):
+    def test_assets_map_to_output_files(self):
+        self.assertEqual(reference_to_path("/images/a.png", "docs"), os.path.join("docs", "images", "a.png"))
+        self.assertEqual(reference_to_path("/index.css?v=2", "docs"), os.path.join("docs", "index.css"))
+
+    def test_pages_and_external_urls_are_ignored(self):
+        for url in ("/blog/", "/blog", "/about.html", "https://example.com/a.png", "//cdn/a.png", "a.png"):
+            self.assertIsNone(reference_to_path(url, "docs"), url)
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def test_affected_is_transitive(self):
+        graph = DependencyGraph()
+        graph.record_static("docs/images/a.png", "public/images/a.png")
+        graph.record_page("docs/a.html", "content/a.md", "template.html", {"/images/a.png", "/b"}, "docs")
+        graph.record_page("docs/b.html", "content/b.md", "template.html", set(), "docs")
+        self.assertEqual(graph.affected(["public/images/a.png"]), [os.path.normpath("docs/a.html"), os.path.normpath("docs/images/a.png")])
+        self.assertEqual(graph.affected(["content/b.md"]), [os.path.normpath("docs/b.html")])
+        self.assertEqual(len(graph.affected(["./template.html"])), 2)
+        self.assertEqual(graph.affected(["README.md"]), [])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache", "deps.json")
+            graph = DependencyGraph(path)
+            graph.basepath = "/"
+            graph.record_page("docs/a.html", "content/a.md", "template.html", set(), "docs")
+            graph.save()
+            loaded = DependencyGraph.load(path)
+            self.assertEqual((loaded.basepath, loaded.nodes), ("/", graph.nodes))
+
+
+class TestChangedBuild(SiteTestCase):
+    chdir = True
+
+    def setUp(self):
+        super().setUp()
+        os.makedirs("content/blog")
+        os.makedirs("public/images")
+        self.write("template.html", TEMPLATE)
+        self.write("public/index.css", "body {}")
+        self.write("public/images/a.png", "png")
+        self.write("content/index.md", "# Home\n\n![a](/images/a.png)")
+        self.write("content/blog/index.md", "# Blog\n\n[Home](/)")
+        self.build()
+
+    def build(self, *argv):
+        log = io.StringIO()
+        with redirect_stdout(log):
+            main.main(["/", *argv])
+        return log.getvalue()
+
+    def test_changed_asset_rebuilds_referencing_pages(self):
+        self.write("public/images/a.png", "png2")
+        log = self.build("--changed", "public/images/a.png")
+        self.assertIn("content/index.md", log)
+        self.assertNotIn("content/blog/index.md", log)
+        with open("docs/images/a.png") as f:
+            self.assertEqual(f.read(), "png2")
+
+    def test_changed_stylesheet_rebuilds_every_page(self):
+        log = self.build("--changed", "public/index.css")
+        self.assertIn("content/index.md", log)
+        self.assertIn("content/blog/index.md", log)
+
+    def test_absolute_changed_paths(self):
+        nodes = dict(DependencyGraph.load().nodes)
+        log = self.build("--changed", os.path.abspath("public/index.css"), os.path.abspath("content/index.md"))
+        self.assertIn("content/index.md", log)
+        self.assertIn("content/blog/index.md", log)
+        self.assertEqual(DependencyGraph.load().nodes, nodes)
+
+    def test_changed_pages_use_jobs(self):
+        with mock.patch("main.render_pages", wraps=main.render_pages) as render:
+            log = self.build("-j", "2", "--changed", "public/index.css")
+        self.assertEqual(render.call_args.args[3], 2)
+        self.assertIn("Regenerated 3 output(s)", log)
+
+    def test_new_and_removed_pages(self):
+        self.write("content/blog/new.md", "# New")
+        os.remove("content/index.md")
+        self.build("--changed", "content/blog/new.md", "content/index.md")
+        self.assertTrue(os.path.exists("docs/blog/new.html"))
+        self.assertFalse(os.path.exists("docs/index.html"))
+        graph = DependencyGraph.load()
+        self.assertIn(os.path.normpath("docs/blog/new.html"), graph.nodes)
+        self.assertNotIn(os.path.normpath("docs/index.html"), graph.nodes)
+
+    def test_removed_page_takes_its_empty_directory_along(self):
+        precompress = ["--precompress", "--precompress-min-size", "0"]
+        for argv in (["--incremental"], ["--changed", "content/blog/index.md"]):
+            with self.subTest(argv=argv):
+                self.write("content/blog/index.md", "# Blog\n\n" + "Posts " * 100)
+                self.build("--incremental", *precompress)
+                self.assertTrue(os.path.exists("docs/blog/index.html.gz"))
+                os.remove("content/blog/index.md")
+                self.build(*argv, *precompress)
+                self.assertFalse(os.path.exists("docs/blog"))
+                self.assertTrue(os.path.exists("docs/index.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import fileio
+from fileio import FileIO, atomic_write, read_source
+
+
+class TestAtomicWrite(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "page.html")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self):
+        with open(self.path) as f:
+            return f.read()
+
+    def test_writes_string_and_chunks(self):
+        atomic_write(self.path, "<p>one</p>")
+        self.assertEqual(self.read(), "<p>one</p>")
+        atomic_write(self.path, iter(["<p>", "two", "</p>"]))
+        self.assertEqual(self.read(), "<p>two</p>")
+        self.assertEqual(os.listdir(self.tmp.name), ["page.html"])
+
+    def test_failure_keeps_old_file(self):
+        atomic_write(self.path, "old")
+
+        def chunks():
+            yield "partial"
+            raise RuntimeError("render failed")
+
+        with self.assertRaises(RuntimeError):
+            atomic_write(self.path, chunks())
+        self.assertEqual(self.read(), "old")
+        self.assertEqual(os.listdir(self.tmp.name), ["page.html"])
+
+    def test_identical_content_is_not_rewritten(self):
+        fileio.reset_output_stats()
+        self.assertTrue(atomic_write(self.path, "same"))
+        os.utime(self.path, ns=(0, 0))
+        self.assertFalse(atomic_write(self.path, "same"))
+        self.assertFalse(atomic_write(self.path, iter(["sa", "me"])))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+        self.assertTrue(atomic_write(self.path, "diff"))
+        self.assertTrue(atomic_write(self.path, iter(["longer"])))
+        self.assertEqual(fileio.output_stats(), {"written": 3, "unchanged": 2, "removed": 0})
+        self.assertEqual(os.listdir(self.tmp.name), ["page.html"])
+
+    def test_read_source_skips_large_files(self):
+        atomic_write(self.path, "x" * 10)
+        self.assertEqual(read_source(self.path), "x" * 10)
+        self.assertEqual(read_source(self.path, 100), "x" * 10)
+        self.assertIsNone(read_source(self.path, 10))
+
+
+class TestFileIO(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i in range(10):
+            path = os.path.join(self.tmp.name, f"{i}.md")
+            atomic_write(path, f"page {i}")
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_prefetched_reads_and_queued_writes(self):
+        with FileIO(in_flight=3) as page_io:
+            page_io.prefetch(self.paths)
+            self.assertLessEqual(len(page_io._reads), 3)
+            for path in self.paths:
+                page_io.write(path + ".html", page_io.read(path).upper())
+            # Paths that were never prefetched are read inline
+            self.assertEqual(page_io.read(self.paths[0]), "page 0")
+        for i, path in enumerate(self.paths):
+            with open(path + ".html") as f:
+                self.assertEqual(f.read(), f"PAGE {i}")
+
+    def test_in_flight_writes_are_bounded(self):
+        outstanding = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow_write(path, content):
+            with lock:
+                outstanding.append(path)
+                peak.append(len(outstanding))
+            time.sleep(0.01)
+            with lock:
+                outstanding.remove(path)
+
+        with mock.patch.object(fileio, "atomic_write", slow_write):
+            with FileIO(in_flight=2) as page_io:
+                for path in self.paths:
+                    page_io.write(path, "x")
+        self.assertEqual(len(peak), len(self.paths))
+        self.assertLessEqual(max(peak), 2)
+
+    def test_write_errors_raise_on_close(self):
+        page_io = FileIO(in_flight=2)
+        page_io.write(os.path.join(self.tmp.name, "missing", "page.html"), "x")
+        with self.assertRaises(OSError):
+            page_io.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
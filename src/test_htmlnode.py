@@ -230,3 +230,58 @@ class TestParentNode(unittest.TestCase):
         expected = "ParentNode(div, children: [LeafNode(span, child, None)], {'id': 'main'})"
         self.assertEqual(str(node), expected)
 
+
+    def test_iter_html_chunks(self):
+        node = ParentNode("p", [LeafNode("b", "Bold"), LeafNode(None, " text")], {"class": "x"})
+        self.assertEqual(list(node.iter_html()), ['<p class="x">', "<b>Bold</b>", " text", "</p>"])
+        self.assertEqual("".join(node.iter_html()), node.to_html())
+
+    def test_write_html(self):
+        import io
+        node = ParentNode("div", [ParentNode("ul", [ParentNode("li", [LeafNode(None, "a")])]), LeafNode("i", "b")])
+        buffer = io.StringIO()
+        node.write_html(buffer)
+        self.assertEqual(buffer.getvalue(), "<div><ul><li>a</li></ul><i>b</i></div>")
+        buffer = io.StringIO()
+        LeafNode("b", "leaf").write_html(buffer)
+        self.assertEqual(buffer.getvalue(), "<b>leaf</b>")
+
+    def test_iter_html_deep_tree(self):
+        node = LeafNode(None, "x")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertEqual(len(html), 5000 * len("<span></span>") + 1)
+        self.assertTrue(html.startswith("<span><span>"))
+
+    def test_iter_html_nested_errors(self):
+        with self.assertRaises(ValueError):
+            ParentNode("div", [ParentNode(None, [LeafNode("b", "x")])]).to_html()
+        with self.assertRaises(ValueError):
+            ParentNode("div", [ParentNode("p", None)]).to_html()
+        with self.assertRaises(ValueError):
+            ParentNode("div", [ParentNode("p", [LeafNode("b", None)])]).to_html()
+
+    def test_slots(self):
+        for node in (HTMLNode("div"), LeafNode("b", "x"), ParentNode("p", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+            with self.assertRaises(AttributeError):
+                node.extra = 1
+        leaf = LeafNode("a", "x", {"href": "/"})
+        self.assertEqual((leaf.tag, leaf.value, leaf.children, leaf.props), ("a", "x", None, {"href": "/"}))
+        parent = ParentNode("p", [leaf])
+        self.assertEqual((parent.tag, parent.value, parent.children, parent.props), ("p", None, [leaf], None))
+
+    def test_basepath_applied_to_url_attributes(self):
+        node = ParentNode("p", [
+            LeafNode("a", "home", {"href": "/blog", "title": "/blog"}),
+            LeafNode("img", "", {"src": "/a.png", "alt": "a"}),
+            LeafNode("a", "ext", {"href": "https://x.com/"}),
+            LeafNode(None, 'href="/raw"'),
+        ], {"data-src": "/keep"})
+        self.assertEqual(
+            node.to_html("/repo/"),
+            '<p data-src="/keep"><a href="/repo/blog" title="/blog">home</a><img src="/repo/a.png" alt="a"></img>'
+            '<a href="https://x.com/">ext</a>href="/raw"</p>',
+        )
+        self.assertEqual(node.to_html("/"), node.to_html())
@@ -0,0 +1,164 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import images
+from images import (
+    build_variants, configure_images, decode_png, encode_png, image_attributes,
+    image_size, resize_rows, variant_url,
+)
+from helper import inline_memo, text_to_children
+
+
+def gradient(width, height, channels=3):
+    return [bytes((x * 7 + y * 3 + c * 50) % 256 for x in range(width) for c in range(channels)) for y in range(height)]
+
+
+class TestPng(unittest.TestCase):
+    def test_round_trip(self):
+        for channels in (1, 2, 3, 4):
+            rows = gradient(13, 5, channels)
+            decoded = decode_png(encode_png(13, 5, channels, rows))
+            self.assertEqual(decoded, (13, 5, channels, rows))
+
+    def test_unsupported_png(self):
+        self.assertIsNone(decode_png(b"GIF89a"))
+
+    def test_image_size(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            png = os.path.join(tmp, "a.png")
+            with open(png, "wb") as f:
+                f.write(encode_png(40, 30, 3, gradient(40, 30)))
+            gif = os.path.join(tmp, "a.gif")
+            with open(gif, "wb") as f:
+                f.write(b"GIF89a\x10\x00\x08\x00" + bytes(20))
+            jpeg = os.path.join(tmp, "a.jpg")
+            with open(jpeg, "wb") as f:
+                f.write(b"\xff\xd8\xff\xe0\x00\x04\x00\x00\xff\xc0\x00\x11\x08\x00\x20\x00\x40" + bytes(12))
+            text = os.path.join(tmp, "a.css")
+            with open(text, "w") as f:
+                f.write("body {}")
+            self.assertEqual(image_size(png), (40, 30))
+            self.assertEqual(image_size(gif), (16, 8))
+            self.assertEqual(image_size(jpeg), (64, 32))
+            self.assertIsNone(image_size(text))
+            for path, size in ((png, 20), (gif, 8), (jpeg, 12)):
+                with open(path, "rb") as f:
+                    data = f.read(size)
+                with open(path, "wb") as f:
+                    f.write(data)
+                self.assertIsNone(image_size(path), path)
+
+
+class TestResize(unittest.TestCase):
+    def test_dimensions_keep_aspect_ratio(self):
+        height, rows = resize_rows(40, 30, 3, gradient(40, 30), 20)
+        self.assertEqual(height, 15)
+        self.assertEqual(len(rows), 15)
+        self.assertTrue(all(len(row) == 20 * 3 for row in rows))
+
+    def test_box_filter_averages(self):
+        rows = [bytes([0, 100, 10, 30]), bytes([200, 100, 30, 50])]
+        height, resized = resize_rows(4, 2, 1, rows, 2)
+        self.assertEqual((height, resized), (1, [bytes([100, 30])]))
+
+
+class TestBuildVariants(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "public")
+        self.target = os.path.join(self.tmp.name, "docs")
+        self.cache = os.path.join(self.tmp.name, "cache")
+        os.makedirs(os.path.join(self.source, "images"))
+        self.image = os.path.join(self.source, "images", "a.png")
+        with open(self.image, "wb") as f:
+            f.write(encode_png(40, 30, 3, gradient(40, 30)))
+        with open(os.path.join(self.source, "index.css"), "w") as f:
+            f.write("body {}")
+        patcher = mock.patch("images._pillow", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        configure_images(None)
+
+    def build(self, widths=(10, 20, 80)):
+        return build_variants(self.source, self.target, widths, jobs=1, cache_dir=self.cache)
+
+    def test_variants_are_written_and_catalogued(self):
+        catalog, stats, outputs = self.build()
+        entry = catalog["/images/a.png"]
+        self.assertEqual((entry["width"], entry["height"]), (40, 30))
+        # 80 is wider than the source, so it is skipped
+        self.assertEqual([width for _, width in entry["variants"]], [10, 20])
+        self.assertEqual((stats["generated"], stats["written"]), (2, 2))
+        for url, width in entry["variants"]:
+            output = os.path.join(self.target, url.lstrip("/"))
+            self.assertEqual(outputs[output], self.image)
+            self.assertEqual(image_size(output), (width, round(width * 30 / 40)))
+        self.assertNotIn("/index.css", catalog)
+
+    def test_cached_variants_are_reused(self):
+        self.build()
+        with mock.patch("images.make_variant") as make:
+            _, stats, _ = self.build()
+        make.assert_not_called()
+        self.assertEqual((stats["generated"], stats["reused"], stats["unchanged"]), (0, 2, 2))
+
+    def test_changed_image_gets_new_variant_names(self):
+        catalog, _, _ = self.build()
+        with open(self.image, "wb") as f:
+            f.write(encode_png(40, 30, 3, gradient(40, 30, 3)[::-1]))
+        changed, stats, _ = self.build()
+        self.assertEqual(stats["generated"], 2)
+        self.assertNotEqual(catalog["/images/a.png"]["variants"], changed["/images/a.png"]["variants"])
+
+    def test_catalog_only(self):
+        catalog, stats, outputs = build_variants(self.source, None, (20,), jobs=1, cache_dir=self.cache)
+        self.assertEqual(len(catalog["/images/a.png"]["variants"]), 1)
+        self.assertEqual((outputs, stats["written"]), ({}, 0))
+        self.assertFalse(os.path.exists(self.target))
+
+
+class TestImageAttributes(unittest.TestCase):
+    def setUp(self):
+        # Memoized image nodes carry the attributes of the catalog they were made with
+        inline_memo.clear()
+        configure_images({"/images/a.png": {"width": 1000, "height": 500, "variants": [[variant_url("/images/a.png", "0123456789abcdef", 480), 480]]}})
+
+    def tearDown(self):
+        configure_images(None)
+        inline_memo.clear()
+
+    def test_off_by_default(self):
+        configure_images(None)
+        self.assertIsNone(image_attributes("/images/a.png"))
+        self.assertEqual(text_to_children("![alt](/images/a.png)")[0].props, {"src": "/images/a.png", "alt": "alt"})
+
+    def test_catalogued_image(self):
+        self.assertEqual(image_attributes("/images/a.png"), {
+            "srcset": "/images/a.0123456789.480w.png 480w, /images/a.png 1000w",
+            "width": "1000",
+            "height": "500",
+            "loading": "lazy",
+        })
+
+    def test_unknown_image_is_still_lazy(self):
+        self.assertEqual(image_attributes("https://example.com/a.png"), {"loading": "lazy"})
+
+    def test_srcset_gets_basepath(self):
+        html = text_to_children("![alt](/images/a.png)")[0].to_html("/blog/")
+        self.assertIn('src="/blog/images/a.png"', html)
+        self.assertIn('srcset="/blog/images/a.0123456789.480w.png 480w, /blog/images/a.png 1000w"', html)
+        self.assertIn('width="1000" height="500" loading="lazy"', html)
+
+    def test_catalog_digest_changes_with_catalog(self):
+        digest = images.catalog_digest()
+        configure_images({})
+        self.assertNotEqual(images.catalog_digest(), digest)
+
+
+if __name__ == "__main__":
+    unittest.main()
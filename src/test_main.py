@@ -0,0 +1,137 @@
+import io
+import json
+import os
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+
+import main
+from testutil import TEMPLATE, SiteTestCase
+
+
+class TestBuildPipeline(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.docs = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog", "post"))
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[Blog](/blog)")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nPosts")
+        self.write(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\nText")
+        self.write(os.path.join(self.content, "notes.txt"), "not markdown")
+
+    def test_collect_pages(self):
+        pages = main.collect_pages(self.content, self.docs)
+        self.assertEqual(pages, [
+            (os.path.join(self.content, "blog", "index.md"), os.path.join(self.docs, "blog", "index.html")),
+            (os.path.join(self.content, "blog", "post", "index.md"), os.path.join(self.docs, "blog", "post", "index.html")),
+            (os.path.join(self.content, "index.md"), os.path.join(self.docs, "index.html")),
+        ])
+
+    def test_parallel_matches_sequential(self):
+        serial_docs = os.path.join(self.root, "serial")
+        with redirect_stdout(io.StringIO()) as serial_log:
+            main.generate_pages_recursive("/base/", self.content, self.template, serial_docs)
+        with redirect_stdout(io.StringIO()) as parallel_log:
+            main.generate_pages_recursive("/base/", self.content, self.template, self.docs, jobs=2)
+        self.assertEqual(serial_log.getvalue().replace(serial_docs, self.docs), parallel_log.getvalue())
+        for _, dest_path in main.collect_pages(self.content, self.docs):
+            self.assertEqual(self.read(dest_path), self.read(dest_path.replace(self.docs, serial_docs)))
+        self.assertIn('href="/base/blog"', self.read(os.path.join(self.docs, "index.html")))
+
+    def test_reports_failures_per_file(self):
+        broken = os.path.join(self.content, "blog", "index.md")
+        self.write(broken, "no title here")
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                docs = os.path.join(self.root, f"docs{jobs}")
+                stderr = io.StringIO()
+                with redirect_stdout(io.StringIO()), redirect_stderr(stderr):
+                    with self.assertRaises(RuntimeError) as ctx:
+                        main.generate_pages_recursive("/", self.content, self.template, docs, jobs=jobs)
+                self.assertIn(broken, str(ctx.exception))
+                self.assertIn(f"Error generating page from {broken}: Exception: No title found", stderr.getvalue())
+                self.assertTrue(os.path.exists(os.path.join(docs, "index.html")))
+                self.assertTrue(os.path.exists(os.path.join(docs, "blog", "post", "index.html")))
+
+    def test_full_build_skips_unchanged_outputs(self):
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        try:
+            os.makedirs("public")
+            self.write(os.path.join("public", "index.css"), "body {}")
+            with redirect_stdout(io.StringIO()) as log:
+                main.main([])
+            self.assertIn("Outputs: 4 written, 0 unchanged, 0 removed", log.getvalue())
+            index = os.path.join("docs", "index.html")
+            os.utime(index, ns=(0, 0))
+            self.write(os.path.join("docs", "stale.html"), "old")
+            self.write(os.path.join("content", "blog", "index.md"), "# Blog\n\nNew posts")
+            with redirect_stdout(io.StringIO()) as log:
+                main.main([])
+            self.assertIn("Outputs: 1 written, 3 unchanged, 1 removed", log.getvalue())
+            self.assertEqual(os.stat(index).st_mtime_ns, 0)
+            self.assertFalse(os.path.exists(os.path.join("docs", "stale.html")))
+            self.assertIn("New posts", self.read(os.path.join("docs", "blog", "index.html")))
+        finally:
+            os.chdir(cwd)
+
+    def test_precompressed_siblings_follow_rebuilt_pages(self):
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        try:
+            os.makedirs("public")
+            index = os.path.join("docs", "index.html")
+            for later in (["--incremental"], ["--changed", os.path.join("content", "index.md")]):
+                with redirect_stdout(io.StringIO()):
+                    main.main(["--incremental", "--precompress", "--precompress-min-size", "0"])
+                self.assertTrue(os.path.exists(index + ".gz"))
+                self.write(os.path.join("content", "index.md"), f"# Home\n\nEdited for {later[0]}")
+                with redirect_stdout(io.StringIO()):
+                    main.main(later)
+                self.assertIn(f"Edited for {later[0]}", self.read(index))
+                self.assertFalse(os.path.exists(index + ".gz"))
+        finally:
+            os.chdir(cwd)
+
+    def test_fingerprint_build(self):
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        try:
+            os.makedirs("public")
+            self.write(os.path.join("public", "index.css"), "body {}")
+            self.write("template.html", '<link href="/index.css">' + TEMPLATE)
+            with redirect_stdout(io.StringIO()):
+                main.main(["--fingerprint"])
+            with open(os.path.join("docs", "asset-manifest.json")) as f:
+                css = json.load(f)["/index.css"]
+            self.assertRegex(css, r"^/index\.[0-9a-f]{10}\.css$")
+            self.assertIn(f'<link href="{css}">', self.read(os.path.join("docs", "index.html")))
+            self.assertEqual(self.read("docs" + css), "body {}")
+            with redirect_stdout(io.StringIO()):
+                main.main([])
+            self.assertFalse(os.path.exists("docs" + css))
+            self.assertFalse(os.path.exists(os.path.join("docs", "asset-manifest.json")))
+            self.assertIn('<link href="/index.css">', self.read(os.path.join("docs", "index.html")))
+        finally:
+            os.chdir(cwd)
+
+    def test_parse_args(self):
+        args = main.parse_args(["/repo/", "--jobs", "4"])
+        self.assertEqual(args.basepath, "/repo/")
+        self.assertEqual(args.jobs, 4)
+        self.assertEqual(main.parse_args([]).basepath, "/")
+        self.assertIsNone(main.parse_args([]).jobs)
+
+    def test_precompress_uses_every_cpu_unless_jobs_given(self):
+        for argv, jobs in (([], None), (["-j", "2"], 2), (["-j", "0"], None)):
+            args = main.parse_args(["--precompress", *argv])
+            with mock.patch("compress.precompress", return_value=({}, [])) as precompress, redirect_stdout(io.StringIO()):
+                main.precompress_outputs(args, [os.path.join(self.docs, "index.html")])
+            self.assertEqual(precompress.call_args[0][2], jobs, argv)
+
+
+if __name__ == "__main__":
+    unittest.main()
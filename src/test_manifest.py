@@ -0,0 +1,90 @@
+import os
+import unittest
+from unittest import mock
+
+import helper
+import main
+from manifest import BuildManifest, hash_bytes
+from testutil import TEMPLATE, SiteTestCase
+
+
+class TestBuildManifest(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.docs = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nPosts")
+
+    def build(self, basepath="/"):
+        manifest = BuildManifest.load(self.manifest_path)
+        with mock.patch("helper.generate_page", wraps=helper.generate_page) as generate:
+            main.generate_pages_recursive(basepath, self.content, self.template, self.docs, manifest)
+        removed = manifest.prune()
+        manifest.save()
+        return generate.call_count, removed
+
+    def test_hash_bytes_separates_parts(self):
+        self.assertNotEqual(hash_bytes("ab", "c"), hash_bytes("a", "bc"))
+        self.assertEqual(hash_bytes("a", b"b"), hash_bytes(b"a", "b"))
+
+    def test_load_missing_manifest(self):
+        manifest = BuildManifest.load(self.manifest_path)
+        self.assertEqual(manifest.pages, {})
+
+    def test_load_corrupt_manifest(self):
+        self.write(self.manifest_path, "{not json")
+        manifest = BuildManifest.load(self.manifest_path)
+        self.assertEqual(manifest.pages, {})
+
+    def test_second_build_skips_everything(self):
+        self.assertEqual(self.build(), (2, []))
+        self.assertEqual(self.build(), (0, []))
+
+    def test_only_edited_page_is_rebuilt(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+        generated, _ = self.build()
+        self.assertEqual(generated, 1)
+        with open(os.path.join(self.docs, "index.html")) as f:
+            self.assertIn("Changed", f.read())
+
+    def test_template_change_rebuilds_all(self):
+        self.build()
+        self.write(self.template, TEMPLATE + "\n")
+        self.assertEqual(self.build()[0], 2)
+
+    def test_basepath_change_rebuilds_all(self):
+        self.build()
+        self.assertEqual(self.build("/repo/")[0], 2)
+
+    def test_missing_output_is_rebuilt(self):
+        self.build()
+        os.remove(os.path.join(self.docs, "blog", "index.html"))
+        self.assertEqual(self.build()[0], 1)
+
+    def test_output_rewritten_by_another_build_is_rebuilt(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[Blog](/blog)")
+        self.build()
+        # A full build with another basepath rewrites docs/ without the manifest
+        main.generate_pages_recursive("/repo/", self.content, self.template, self.docs)
+        self.assertEqual(self.build()[0], 1)
+        with open(os.path.join(self.docs, "index.html")) as f:
+            self.assertNotIn("/repo/", f.read())
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        generated, removed = self.build()
+        self.assertEqual(generated, 0)
+        self.assertEqual(removed, [os.path.join(self.docs, "blog", "index.html")])
+        self.assertFalse(os.path.exists(removed[0]))
+        self.assertNotIn(os.path.join(self.content, "blog", "index.md"), BuildManifest.load(self.manifest_path).pages)
+
+
+if __name__ == "__main__":
+    unittest.main()
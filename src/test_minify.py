@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+from helper import Template, collect_references, markdown_to_html_node
+from htmlnode import HTMLFragment, LeafNode, ParentNode
+from minify import minify_html
+from render_cache import RenderCache
+
+
+class TestMinifyHTML(unittest.TestCase):
+    def test_template(self):
+        html = """<!doctype html>
+<html>
+  <head>
+    <!-- page metadata -->
+    <meta charset="utf-8" />
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+        self.assertEqual(
+            minify_html(html),
+            '<!doctype html><html><head><meta charset=utf-8 /><title>{{ Title }}</title>'
+            '<link href=/index.css rel=stylesheet /></head><body><article>{{ Content }}</article></body></html>',
+        )
+
+    def test_inline_whitespace_kept_as_one_space(self):
+        self.assertEqual(minify_html("<p>a  <b>x</b>\n  <i>y</i>  </p>"), "<p>a <b>x</b> <i>y</i></p>")
+
+    def test_preformatted_untouched(self):
+        html = "<pre>  a\n\n  <!-- b --></pre><script>if (a  <  b) {}</script>"
+        self.assertEqual(minify_html(html), html)
+
+    def test_conditional_comments_kept(self):
+        self.assertEqual(minify_html("<!--[if IE]><p>x</p><![endif]--><!-- x -->"), "<!--[if IE]><p>x</p><![endif]-->")
+
+    def test_unsafe_quotes_kept(self):
+        html = '<a href="/a b" title="" class="x=y" data-x="a/">t</a>'
+        self.assertEqual(minify_html(html), html)
+
+
+class TestMinifyNodes(unittest.TestCase):
+    def test_collapses_text_and_unquotes(self):
+        node = ParentNode("p", [LeafNode(None, "a   b\n c"), LeafNode("a", "x  y", {"href": "/docs/"})])
+        self.assertEqual(node.to_html(minify=True), '<p>a b c<a href="/docs/">x y</a></p>')
+        self.assertEqual(node.to_html(), '<p>a   b\n c<a href="/docs/">x  y</a></p>')
+
+    def test_preformatted_children_untouched(self):
+        node = ParentNode("div", [ParentNode("pre", [ParentNode("code", [LeafNode(None, "a  =\n  1")])]), LeafNode("code", "x  y")])
+        self.assertEqual(node.to_html(minify=True), "<div><pre><code>a  =\n  1</code></pre><code>x  y</code></div>")
+        self.assertEqual("".join(node.iter_html(minify=True)), node.to_html(minify=True))
+
+    def test_basepath_applied_before_unquoting(self):
+        node = LeafNode("img", "", {"src": "/a.png", "alt": "An image"})
+        self.assertEqual(node.to_html("/repo/", minify=True), '<img src=/repo/a.png alt="An image"></img>')
+
+    def test_fragment_is_verbatim(self):
+        self.assertEqual(HTMLFragment("<pre>a  b</pre>  c").to_html(minify=True), "<pre>a  b</pre>  c")
+
+    def test_cache_keeps_settings_apart(self):
+        markdown = "# Title\n\nSome   [link](/a)\n\n```\nx  = 1\n```"
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = RenderCache(os.path.join(tmp.name, "cache.sqlite"))
+        self.addCleanup(cache.close)
+        minified = markdown_to_html_node(markdown, cache, minify=True).to_html(minify=True)
+        self.assertEqual(minified, markdown_to_html_node(markdown, minify=True).to_html(minify=True))
+        self.assertIn("<pre><code>x  = 1\n</code></pre>", minified)
+        self.assertEqual(markdown_to_html_node(markdown, cache).to_html(), markdown_to_html_node(markdown).to_html())
+
+    def test_template_and_references(self):
+        template = Template('<html>\n  <link href="/index.css" />\n  <body>{{ Content }}</body>\n</html>', "/repo/", minify=True)
+        self.assertEqual(template.render(Content="x"), "<html><link href=/repo/index.css /><body>x</body></html>")
+        self.assertEqual(template.references, {"/index.css"})
+        references = set()
+        list(collect_references(['<a href=/repo/blog/>x</a><img src="/repo/a.png">'], references, "/repo/"))
+        self.assertEqual(references, {"/blog/", "/a.png"})
+
+
+if __name__ == "__main__":
+    unittest.main()
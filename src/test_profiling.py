@@ -0,0 +1,91 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import helper
+import main
+import profiling
+from profiling import BuildProfiler
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def test_stage_is_noop_when_inactive(self):
+        self.assertFalse(profiling.active())
+        with profiling.stage("read"), profiling.page("x.md"):
+            pass
+
+    def test_nested_stages_are_exclusive(self):
+        # A stepped clock instead of sleeps, so the test does not depend on machine load
+        profiler = BuildProfiler()
+        now = [0.0]
+        profiler._clock = lambda: (now[0], now[0])
+        with profiler.stage("outer"):
+            now[0] += 1
+            with profiler.stage("inner"):
+                now[0] += 2
+            now[0] += 4
+        self.assertEqual(profiler.stages["outer"], [1, 5.0, 5.0])
+        self.assertEqual(profiler.stages["inner"], [1, 2.0, 2.0])
+
+    def test_activate_wraps_and_restores_helpers(self):
+        original = helper.text_to_textnodes
+        # Fragments memoized by earlier tests would skip text_to_textnodes
+        helper.inline_memo.clear()
+        with BuildProfiler() as profiler:
+            self.assertTrue(profiling.active())
+            self.assertIsNot(helper.text_to_textnodes, original)
+            helper.markdown_to_html_node("# Title\n\nSome **bold** text")
+        self.assertIs(helper.text_to_textnodes, original)
+        self.assertFalse(profiling.active())
+        self.assertEqual(profiler.stages["text_to_textnodes"][0], 2)
+        self.assertEqual(profiler.stages["markdown_to_blocks"][0], 1)
+
+    def test_generate_page_records_page_and_trace(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "index.md")
+            template = os.path.join(tmp, "template.html")
+            dest = os.path.join(tmp, "index.html")
+            helper.write_file(source, "# Title\n\n[link](/a)")
+            helper.write_file(template, "<title>{{ Title }}</title>{{ Content }}")
+            with BuildProfiler(trace=True) as profiler, redirect_stdout(io.StringIO()):
+                helper.generate_page("/base/", source, template, dest)
+            self.assertEqual(helper.read_file(dest), '<title>Title</title><div><h1>Title</h1><p><a href="/base/a">link</a></p></div>')
+            self.assertEqual([page["path"] for page in profiler.pages], [source])
+            self.assertEqual(set(profiler.pages[0]["stages"]),
+                             {"read", "parse", "markdown_to_blocks", "text_to_textnodes", "to_html", "write"})
+            summary = profiler.summary(5)
+            self.assertIn("Slowest 1 of 1 pages", summary)
+            self.assertIn(source, summary)
+            trace_path = os.path.join(tmp, "trace.json")
+            profiler.write_trace(trace_path)
+            with open(trace_path) as f:
+                trace = json.load(f)
+            self.assertEqual([event["name"] for event in trace["traceEvents"]], ["read", "parse", "to_html", "write", source])
+            self.assertEqual(trace["pages"][0]["path"], source)
+
+    def test_profile_writes_pages_inline(self):
+        # Writes queued on a FileIO pool would finish outside the "write" stage
+        with tempfile.TemporaryDirectory() as tmp:
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                os.makedirs("content")
+                os.makedirs("public")
+                helper.write_file("template.html", "<title>{{ Title }}</title>{{ Content }}")
+                helper.write_file(os.path.join("content", "index.md"), "# Home")
+                helper.write_file(os.path.join("content", "about.md"), "# About")
+                with mock.patch("main.FileIO") as file_io, redirect_stdout(io.StringIO()) as out:
+                    main.main(["--profile"])
+            finally:
+                os.chdir(cwd)
+        file_io.assert_not_called()
+        self.assertIn("ignoring --io-in-flight", out.getvalue())
+        self.assertRegex(out.getvalue(), r"\nwrite +2 ")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import main
+from helper import markdown_to_html_node
+from render_cache import RenderCache, renderer_version
+
+MARKDOWN = "# Title\n\nSome **bold** [link](/a)\n\n- one\n- two\n\n```\ncode\n```"
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache", "render.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_put_and_persist(self):
+        cache = RenderCache(self.path)
+        self.assertIsNone(cache.get("block"))
+        cache.put("block", "<p>block</p>")
+        self.assertEqual(cache.get("block"), "<p>block</p>")
+        cache.close()
+        cache = RenderCache(self.path)
+        self.assertEqual(cache.get("block"), "<p>block</p>")
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        cache.close()
+
+    def test_version_change_invalidates(self):
+        cache = RenderCache(self.path, version="v1")
+        cache.put("block", "<p>block</p>")
+        cache.close()
+        cache = RenderCache(self.path, version="v2")
+        self.assertIsNone(cache.get("block"))
+        cache.close()
+
+    def test_renderer_version_is_stable(self):
+        self.assertEqual(renderer_version(), renderer_version())
+
+    def test_renderer_version_covers_serialization_modules(self):
+        import images
+        import minify
+        version = renderer_version()
+        real_open = open
+        for module in (minify, images):
+            def edited(path, *args, **kwargs):
+                if path == module.__file__:
+                    return io.BytesIO(b"# edited")
+                return real_open(path, *args, **kwargs)
+            with mock.patch("builtins.open", edited):
+                self.assertNotEqual(renderer_version(), version)
+
+    def test_lru_eviction(self):
+        cache = RenderCache(self.path, max_bytes=100)
+        for name in "abcd":
+            cache.put(name, name * 30)
+        cache.flush()
+        # Touch "a" so "b" becomes the least recently used entry
+        cache.get("a")
+        self.assertEqual(cache.evict(), 1)
+        self.assertLessEqual(cache.size(), 90)
+        self.assertIsNone(cache.get("b"))
+        for name in "acd":
+            self.assertIsNotNone(cache.get(name))
+        cache.close()
+
+    def test_cached_render_matches_uncached(self):
+        expected = markdown_to_html_node(MARKDOWN).to_html()
+        cache = RenderCache(self.path)
+        self.assertEqual(markdown_to_html_node(MARKDOWN, cache).to_html(), expected)
+        self.assertEqual(cache.misses, 4)
+        self.assertEqual(markdown_to_html_node(MARKDOWN, cache).to_html(), expected)
+        self.assertEqual(cache.hits, 4)
+        cache.close()
+
+    def test_parallel_build_shares_cache(self):
+        content = os.path.join(self.tmp.name, "content")
+        template = os.path.join(self.tmp.name, "template.html")
+        os.makedirs(content)
+        with open(template, "w") as f:
+            f.write("{{ Content }}")
+        for name in ("a", "b", "c"):
+            with open(os.path.join(content, f"{name}.md"), "w") as f:
+                f.write(f"# {name}\n\nshared block")
+        cache = RenderCache(self.path)
+        with redirect_stdout(io.StringIO()):
+            main.generate_pages_recursive("/", content, template, os.path.join(self.tmp.name, "docs"), jobs=2, cache=cache)
+        self.assertEqual(cache.hits + cache.misses, 6)
+        cache.close()
+        cache = RenderCache(self.path)
+        with redirect_stdout(io.StringIO()):
+            main.generate_pages_recursive("/", content, template, os.path.join(self.tmp.name, "docs"), cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (6, 0))
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
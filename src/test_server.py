@@ -0,0 +1,141 @@
+import functools
+import io
+import os
+import threading
+import unittest
+import urllib.request
+from contextlib import redirect_stdout
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+import server
+
+from server import (
+    RELOAD_PATH,
+    LiveReloadHandler,
+    Rebuilder,
+    ReloadHub,
+    Watcher,
+    diff_snapshots,
+    snapshot,
+)
+from testutil import TEMPLATE, SiteTestCase
+
+
+class TestServer(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.docs = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.static)
+        os.makedirs(self.docs)
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nPosts")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.rebuilder = Rebuilder("/", self.content, self.template, self.static, self.docs)
+
+    def test_initial_build_keeps_unchanged_outputs(self):
+        os.rename(self.static, os.path.join(self.root, "public"))
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        try:
+            with mock.patch("server.ThreadingHTTPServer") as http_server, redirect_stdout(io.StringIO()) as log:
+                http_server.return_value.serve_forever.side_effect = KeyboardInterrupt
+                server.main([])
+                index = os.path.join("docs", "index.html")
+                os.utime(index, ns=(0, 0))
+                server.main([])
+            self.assertIn("Outputs: 0 written", log.getvalue())
+            self.assertEqual(os.stat(index).st_mtime_ns, 0)
+        finally:
+            os.chdir(cwd)
+
+    def test_snapshot_and_diff(self):
+        before = snapshot(self.content)
+        self.assertEqual(sorted(before), [
+            os.path.join(self.content, "blog", "index.md"),
+            os.path.join(self.content, "index.md"),
+        ])
+        self.assertEqual(list(snapshot(self.template)), [self.template])
+        after = dict(before)
+        after.pop(os.path.join(self.content, "index.md"))
+        after[os.path.join(self.content, "new.md")] = (1, 1)
+        self.assertEqual(diff_snapshots(before, after), (
+            [os.path.join(self.content, "new.md")],
+            [os.path.join(self.content, "index.md")],
+        ))
+
+    def test_page_dest_path(self):
+        self.assertEqual(
+            self.rebuilder.page_dest_path(os.path.join(self.content, "blog", "index.md")),
+            os.path.join(self.docs, "blog", "index.html"),
+        )
+
+    def test_apply_rebuilds_only_changed_page(self):
+        with redirect_stdout(io.StringIO()) as log:
+            touched = self.rebuilder.apply([os.path.join(self.content, "blog", "index.md")], [])
+        self.assertEqual(touched, 1)
+        self.assertEqual(log.getvalue().count("Generating page"), 1)
+        self.assertIn("<h1>Blog</h1>", self.read(os.path.join(self.docs, "blog", "index.html")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.html")))
+
+    def test_apply_template_change_rebuilds_all(self):
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(self.rebuilder.apply([self.template], []), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+
+    def test_apply_static_and_removals(self):
+        css = os.path.join(self.static, "index.css")
+        self.assertEqual(self.rebuilder.apply([css], []), 1)
+        self.assertEqual(self.read(os.path.join(self.docs, "index.css")), "body {}")
+        with redirect_stdout(io.StringIO()):
+            self.rebuilder.apply([os.path.join(self.content, "index.md")], [])
+        self.assertEqual(self.rebuilder.apply([], [css, os.path.join(self.content, "index.md")]), 2)
+        self.assertEqual(os.listdir(self.docs), [])
+
+    def test_watcher_poll_notifies(self):
+        hub = ReloadHub()
+        watcher = Watcher([self.content, self.template, self.static], self.rebuilder, hub)
+        self.assertFalse(watcher.poll())
+        page = os.path.join(self.content, "index.md")
+        self.write(page, "# Home\n\nEdited")
+        stat = os.stat(page)
+        os.utime(page, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(watcher.poll())
+        self.assertEqual(hub.version, 1)
+        self.assertIn("Edited", self.read(os.path.join(self.docs, "index.html")))
+
+    def test_hub_wait(self):
+        hub = ReloadHub()
+        self.assertEqual(hub.wait(0, 0.01), 0)
+        threading.Timer(0.01, hub.notify).start()
+        self.assertEqual(hub.wait(0, 5), 1)
+
+    def test_handler_injects_script_and_pushes_reload(self):
+        self.write(os.path.join(self.docs, "index.html"), "<html><body><p>x</p></body></html>")
+        hub = ReloadHub()
+        handler = functools.partial(type("Handler", (LiveReloadHandler,), {"hub": hub, "log_message": lambda *a: None}), directory=self.docs)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            with urllib.request.urlopen(base + "/") as response:
+                body = response.read().decode()
+            self.assertIn(RELOAD_PATH, body)
+            self.assertTrue(body.endswith("</script></body></html>"))
+            with urllib.request.urlopen(base + RELOAD_PATH, timeout=5) as events:
+                threading.Timer(0.05, hub.notify).start()
+                self.assertEqual(events.readline(), b"data: reload\n")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import argparse
+import io
+import os
+import subprocess
+import sys
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+
+import main
+from shards import check_shards, parse_shard, select_shard, shard_of
+from testutil import SiteTestCase
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(main.__file__)), "main.py")
+TEMPLATE = '<html><link href="/index.css"><body>{{ Content }}</body></html>'
+
+
+class TestPartition(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for value in ("0/4", "5/4", "1/0", "x/2", "3"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(value)
+
+    def test_shards_are_disjoint_and_complete(self):
+        pages = [(os.path.join("content", f"p{i}.md"), os.path.join("docs", f"p{i}.html")) for i in range(200)]
+        selected = [select_shard(pages, "content", (k, 3)) for k in (1, 2, 3)]
+        self.assertEqual(sorted(sum(selected, [])), sorted(pages))
+        self.assertTrue(all(len(part) > 40 for part in selected))
+        # Same answer on every machine, independent of the content root
+        self.assertEqual(shard_of("blog/post.md", 3), shard_of("blog/post.md", 3))
+        self.assertEqual(select_shard([("/abs/content/p1.md", "x")], "/abs/content", (shard_of("p1.md", 3), 3)), [("/abs/content/p1.md", "x")])
+
+    def test_check_shards(self):
+        def manifest(k, files, shards=2, basepath="/"):
+            return {"shard": k, "shards": shards, "basepath": basepath, "files": dict.fromkeys(files, "")}
+        self.assertEqual(check_shards({"a": manifest(1, ["x.html"]), "b": manifest(2, ["y.html"])}, {"i.png"}), [])
+        problems = check_shards({"a": manifest(1, ["x.html", "i.png"]), "b": manifest(1, ["x.html"])}, {"i.png"})
+        self.assertEqual(problems, [
+            "shard 1/2 given more than once: a, b",
+            "missing shard(s) 2 of 2",
+            "collision on i.png: static assets, a",
+            "collision on x.html: a, b",
+        ])
+        self.assertEqual(len(check_shards({"a": manifest(1, []), "b": manifest(2, [], basepath="/repo/")}, set())), 1)
+
+
+class TestShardedBuild(SiteTestCase):
+    chdir = True
+
+    def setUp(self):
+        super().setUp()
+        os.makedirs("public/images")
+        self.write("template.html", TEMPLATE)
+        self.write("public/index.css", "body {}")
+        self.write("public/images/a.png", "png")
+        for i in range(8):
+            os.makedirs(f"content/s{i}")
+            self.write(f"content/s{i}/index.md", f"# Page {i}\n\n![a](/images/a.png) [next](/s{i + 1})")
+
+    def tree(self, root):
+        files = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                path = os.path.join(directory, name)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, root)] = f.read()
+        return files
+
+    def test_shards_in_separate_processes_merge_to_full_build(self):
+        for shard in ("1/3", "2/3", "3/3"):
+            subprocess.run([sys.executable, MAIN, "/repo/", "--shard", shard], check=True, capture_output=True)
+        with redirect_stdout(io.StringIO()):
+            main.main(["/repo/"])
+        full = self.tree("docs")
+        os.rename("docs", "full")
+        with redirect_stdout(io.StringIO()) as log:
+            main.main(["merge", "shards/1-of-3", "shards/2-of-3", "shards/3-of-3"])
+        self.assertIn("Merged 3 shard(s): 8 page(s)", log.getvalue())
+        self.assertEqual(self.tree("docs"), full)
+        with redirect_stdout(io.StringIO()):
+            main.main(["merge", "--precompress", "--precompress-min-size", "0", "shards/1-of-3", "shards/2-of-3", "shards/3-of-3"])
+        self.assertTrue(os.path.exists(os.path.join("docs", "s1", "index.html.gz")))
+        # The merged graph drives --changed rebuilds like a regular build does
+        with redirect_stdout(io.StringIO()) as log:
+            main.main(["/repo/", "--changed", "public/images/a.png"])
+        self.assertIn("Regenerated 9 output(s)", log.getvalue())
+
+    def test_merge_refuses_incomplete_or_damaged_shards(self):
+        with redirect_stdout(io.StringIO()):
+            main.main(["--shard", "1/2"])
+            main.main(["--shard", "2/2"])
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()) as errors:
+            with self.assertRaises(RuntimeError):
+                main.main(["merge", "shards/1-of-2"])
+        self.assertIn("missing shard(s) 2 of 2", errors.getvalue())
+        damaged = next(os.path.join(d, f) for d, _, fs in os.walk("shards/2-of-2") for f in fs if f.endswith(".html"))
+        self.write(damaged, "truncated")
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()) as errors:
+            with self.assertRaises(RuntimeError):
+                main.main(["merge", "shards/1-of-2", "shards/2-of-2"])
+        self.assertIn(f"{damaged} is missing or does not match", errors.getvalue())
+        self.assertFalse(os.path.exists("docs"))
+
+    def test_shard_dir_is_checked_before_deleting(self):
+        with redirect_stdout(io.StringIO()):
+            with self.assertRaises(ValueError):
+                main.main(["--shard", "1/2", "--shard-dir", "."])
+            with self.assertRaises(ValueError):
+                main.main(["--shard", "1/2", "--shard-dir", os.path.dirname(os.getcwd())])
+        self.assertTrue(os.path.exists("template.html"))
+        self.assertTrue(os.path.isdir("content"))
+        with redirect_stdout(io.StringIO()):
+            main.main(["--shard", "1/1", "--shard-dir", "out"])
+        page = next(os.path.join(d, f) for d, _, fs in os.walk("out") for f in fs if f.endswith(".html"))
+        source = os.path.join("content", os.path.relpath(page, "out"))[:-len(".html")] + ".md"
+        os.remove(source)
+        self.write(os.path.join("out", "notes.txt"), "not from a shard build")
+        with redirect_stdout(io.StringIO()):
+            main.main(["--shard", "1/1", "--shard-dir", "out"])
+        # The page of the deleted source goes; files the shard never wrote stay
+        self.assertFalse(os.path.exists(page))
+        self.assertTrue(os.path.exists(os.path.join("out", "notes.txt")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -19,6 +19,19 @@ class TestTextNode(unittest.TestCase):
         self.assertNotEqual(node3, node4)
         self.assertNotEqual(node4, node5)
 
+    def test_slots(self):
+        node = TextNode("text", TextType.BOLD)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = 1
+
+    def test_text_type_coerced_from_value(self):
+        node = TextNode("text", "bold")
+        self.assertIs(node.text_type, TextType.BOLD)
+        self.assertEqual(node, TextNode("text", TextType.BOLD))
+        with self.assertRaises(ValueError):
+            TextNode("text", "underline")
+
     def test_to_html_node(self):
         # Test TEXT text type
         TEXT_node = TextNode("Hello world", TextType.TEXT)
@@ -762,6 +775,343 @@ Final paragraph."""
         self.assertEqual(result, "Real Title")
 
 
+class TestTemplate(unittest.TestCase):
+    def test_render_slots(self):
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.assertEqual(template.segments, ["<title>", "</title><main>", "</main>"])
+        self.assertEqual(template.slots, ["Title", "Content"])
+        self.assertEqual(template.render(Title="T", Content="<p>C</p>"), "<title>T</title><main><p>C</p></main>")
+
+    def test_render_unknown_slot_left_untouched(self):
+        template = Template("{{ Title }} {{ Other }}")
+        self.assertEqual(template.render(Title="T"), "T {{ Other }}")
+
+    def test_render_without_slots(self):
+        self.assertEqual(Template("<p>static</p>").render(Title="T"), "<p>static</p>")
+
+    def test_basepath_rewritten_at_compile_time(self):
+        template = Template('<link href="/index.css"><img src="/a.png">{{ Content }}', "/repo/")
+        self.assertEqual(template.segments[0], '<link href="/repo/index.css"><img src="/repo/a.png">')
+        # Slot values are inserted verbatim
+        self.assertEqual(template.render(Content='<a href="/x">'), '<link href="/repo/index.css"><img src="/repo/a.png"><a href="/x">')
+
+    def test_write_streams_chunks(self):
+        import io
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        buffer = io.StringIO()
+        template.write(buffer, Title="T", Content=iter(["<p>", "C", "</p>"]))
+        self.assertEqual(buffer.getvalue(), "<title>T</title><main><p>C</p></main>")
+
+    def test_rewrite_basepath(self):
+        html = '<a href="/blog">b</a><img src="/i.png"><a href="https://x.com">x</a>'
+        self.assertEqual(rewrite_basepath(html, "/"), html)
+        self.assertEqual(
+            rewrite_basepath(html, "/repo/"),
+            '<a href="/repo/blog">b</a><img src="/repo/i.png"><a href="https://x.com">x</a>',
+        )
+
+    def test_generate_page_basepath_leaves_text_alone(self):
+        import io
+        import tempfile
+        from contextlib import redirect_stdout
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "page.md")
+            template = os.path.join(tmp, "template.html")
+            dest = os.path.join(tmp, "page.html")
+            write_file(source, '# Title\n\n[home](/blog) ![i](/i.png)\n\n```\n<a href="/literal">\n```')
+            write_file(template, '<link href="/index.css">{{ Content }}')
+            references = set()
+            with redirect_stdout(io.StringIO()):
+                generate_page("/repo/", source, template, dest, references=references)
+            html = read_file(dest)
+            self.assertIn('<link href="/repo/index.css">', html)
+            self.assertIn('<a href="/repo/blog">home</a> <img src="/repo/i.png" alt="i"></img>', html)
+            self.assertIn('<a href="/literal">', html)
+            self.assertLessEqual({"/index.css", "/blog", "/i.png"}, references)
+
+    def test_fingerprinted_asset_links(self):
+        from assets import AssetManifest
+        assets = AssetManifest({"/index.css": "/index.abc.css", "/i.png": "/i.def.png"})
+        template = Template('<link href="/index.css"><a href="/blog">{{ Content }}', "/repo/", assets=assets)
+        self.assertEqual(template.segments[0], '<link href="/repo/index.abc.css"><a href="/repo/blog">')
+        self.assertEqual(template.references, {"/index.css", "/blog"})
+        html = markdown_to_html_node("![i](/i.png) [i](/i.png#x)\n\n```\n<img src=\"/i.png\">\n```").to_html("/repo/", assets=assets)
+        self.assertIn('<img src="/repo/i.def.png" alt="i"></img> <a href="/repo/i.def.png#x">i</a>', html)
+        # Literal text is not a link
+        self.assertIn('<img src="/i.png">', html)
+
+    def test_load_template_cached_until_changed(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            write_file(path, "<b>{{ Title }}</b>")
+            first = load_template(path, "/")
+            self.assertIs(load_template(path, "/"), first)
+            self.assertIsNot(load_template(path, "/repo/"), first)
+            write_file(path, "<i>{{ Title }}</i> changed")
+            self.assertEqual(load_template(path, "/").render(Title="T"), "<i>T</i> changed")
+
+
+class TestInlineTokenizer(unittest.TestCase):
+    def chained(self, text):
+        nodes = [TextNode(text, TextType.TEXT)]
+        nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+        nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+        nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+        nodes = split_nodes_image(nodes)
+        nodes = split_nodes_link(nodes)
+        return nodes
+
+    def assertMatchesChained(self, text):
+        try:
+            expected = self.chained(text)
+        except ValueError:
+            with self.assertRaises(ValueError):
+                text_to_textnodes(text)
+            return
+        self.assertEqual(text_to_textnodes(text), expected, repr(text))
+
+    def test_matches_chained_passes(self):
+        cases = [
+            "",
+            "plain text",
+            "**bold** and _italic_ and `code`",
+            "****",
+            "_a **b_ c**",
+            "`a_b`",
+            "_a `b` c_",
+            "![img](a.png)[link](b.com)",
+            "![x] ![y](z) [l](u)",
+            "[a](b ![i](u) c)",
+            "**[bold link](u)** ![i](u)",
+            "line one\nline ![two](t)\n[three](3)",
+        ]
+        for text in cases:
+            self.assertMatchesChained(text)
+
+    def test_matches_chained_passes_random(self):
+        import random
+        rng = random.Random(1234)
+        tokens = ["a", "b ", " ", "**", "_", "`", "![", "[", "](", ")", "]", "(", "!", "\n"]
+        for _ in range(3000):
+            self.assertMatchesChained("".join(rng.choice(tokens) for _ in range(rng.randint(0, 14))))
+
+    def test_many_links(self):
+        text = " ".join(f"[l{i}](u{i})" for i in range(300))
+        nodes = text_to_textnodes(text)
+        self.assertEqual(len(nodes), 599)
+        self.assertEqual(nodes[-1], TextNode("l299", TextType.LINK, "u299"))
+        self.assertEqual(nodes, self.chained(text))
+
+
+class TestExtractorFastPaths(unittest.TestCase):
+    def test_plain_prose_skips_regex(self):
+        from unittest import mock
+        import helper
+        with mock.patch.object(helper, "IMAGE_PATTERN") as images, \
+                mock.patch.object(helper, "LINK_PATTERN") as links, \
+                mock.patch.object(helper, "HEADING_PATTERN") as heading:
+            self.assertEqual(extract_markdown_images("plain prose (with parens)"), [])
+            self.assertEqual(extract_markdown_links("plain prose (with parens)"), [])
+            self.assertFalse(is_md_heading("plain prose"))
+        images.findall.assert_not_called()
+        links.findall.assert_not_called()
+        heading.match.assert_not_called()
+
+    def test_fast_path_edge_cases(self):
+        self.assertEqual(extract_markdown_images("[not an image](x)"), [])
+        self.assertEqual(extract_markdown_links("![only image](x)"), [])
+        self.assertEqual(extract_markdown_links("![i](x) [l](y)"), [("l", "y")])
+        self.assertFalse(is_md_heading(""))
+        self.assertFalse(is_md_heading("####### seven"))
+        self.assertTrue(is_md_heading("###### six"))
+
+    def test_micro_benchmark_runs(self):
+        # Timings are for `python -m benchmarks.extractors`; here only check that
+        # the benchmark runs and the old and new extractors still agree
+        from benchmarks import extractors
+        names = [name for name, _, _ in extractors.run(number=10)]
+        for name in ("images/prose", "links/prose", "heading/prose"):
+            self.assertIn(name, names)
+
+
+class TestStreamingBlocks(unittest.TestCase):
+    def test_iter_markdown_blocks_matches_markdown_to_blocks(self):
+        import random
+        rng = random.Random(99)
+        pieces = ["a", "b c", "\n", "\n\n", "\n\n\n", "  ", "\t", "# h", "- x"]
+        cases = ["", "\n", "a\n\nb", "a\n  \nb", "a\n\n  \n\nb", "\n\na\n\n\n\nb\n"]
+        cases += ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 20))) for _ in range(2000)]
+        for markdown in cases:
+            lines = markdown.splitlines(keepends=True)
+            self.assertEqual(list(iter_markdown_blocks(lines)), markdown_to_blocks(markdown), repr(markdown))
+
+    def test_iter_markdown_html_matches_tree(self):
+        import io
+        markdown = "# Title\n\nSome **bold** [link](/a)\n\n- one\n- two\n\n```\ncode\n```\n"
+        self.assertEqual("".join(iter_markdown_html(io.StringIO(markdown))), markdown_to_html_node(markdown).to_html())
+
+    def test_extract_title_from_lines(self):
+        self.assertEqual(extract_title_from_lines(iter(["## no", "# Yes  "])), "Yes")
+        with self.assertRaises(Exception):
+            extract_title_from_lines(iter([]))
+
+    def test_streaming_page_matches_and_bounds_memory(self):
+        import contextlib
+        import io
+        import tempfile
+        import tracemalloc
+        from unittest import mock
+        import helper
+        block = "Paragraph with **bold**, _italic_ and a [link](/page) " * 20
+        # The inline memo's memory is bounded by its entry limit, not the document;
+        # keep it out of the measurement
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(helper, "inline_memo", helper.InlineMemo(max_entries=0)):
+            template = os.path.join(tmp, "template.html")
+            write_file(template, "<title>{{ Title }}</title>{{ Content }}")
+            peaks = []
+            for sections in (100, 300):
+                markdown = "# Big\n\n" + "\n\n".join(f"## Section {i}\n\n{block}" for i in range(sections))
+                source = os.path.join(tmp, f"big{sections}.md")
+                expected = os.path.join(tmp, f"expected{sections}.html")
+                streamed = os.path.join(tmp, f"streamed{sections}.html")
+                write_file(source, markdown)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    generate_page("/base/", source, template, expected)
+                tracemalloc.start()
+                generate_page_streaming("/base/", source, template, streamed)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+                self.assertEqual(read_file(streamed), read_file(expected))
+            # Tripling the document must not grow peak memory the way buffering would
+            self.assertLess(peaks[1], peaks[0] * 1.3)
+            self.assertLess(peaks[1], len(markdown) // 2)
+
+    def test_generate_page_streams_large_sources(self):
+        import contextlib
+        import io
+        import tempfile
+        from unittest import mock
+        import helper
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "index.md")
+            template = os.path.join(tmp, "template.html")
+            write_file(source, "# T\n\nbody")
+            write_file(template, "{{ Content }}")
+            with mock.patch.object(helper, "STREAMING_THRESHOLD", 1), \
+                    mock.patch.object(helper, "generate_page_streaming") as streaming, \
+                    contextlib.redirect_stdout(io.StringIO()):
+                generate_page("/", source, template, os.path.join(tmp, "out.html"))
+            streaming.assert_called_once()
+
+
+class TestBlockScanner(unittest.TestCase):
+    def test_crlf_and_whitespace_only_separators(self):
+        markdown = "# Title\r\n\r\nline one\r\nline two\r\n \t\r\n- a\r\n- b\r\n"
+        self.assertEqual(markdown_to_typed_blocks(markdown), [
+            ("# Title", BlockType.HEADING),
+            ("line one\nline two", BlockType.PARAGRAPH),
+            ("- a\n- b", BlockType.UNORDERED_LIST),
+        ])
+
+    def test_fenced_code_keeps_blank_lines(self):
+        markdown = "Intro\n\n```\nx = 1\n\n\ny = 2\n```\n\nOutro"
+        self.assertEqual(markdown_to_typed_blocks(markdown), [
+            ("Intro", BlockType.PARAGRAPH),
+            ("```\nx = 1\n\n\ny = 2\n```", BlockType.CODE),
+            ("Outro", BlockType.PARAGRAPH),
+        ])
+        html = markdown_to_html_node("```\nx = 1\n\ny = 2\n```").to_html()
+        self.assertEqual(html, "<div><pre><code>x = 1\n\ny = 2\n</code></pre></div>")
+        self.assertEqual(markdown_to_typed_blocks("```one line```\n\nnext"), [
+            ("```one line```", BlockType.CODE),
+            ("next", BlockType.PARAGRAPH),
+        ])
+
+    def test_unclosed_fence_does_not_swallow_document(self):
+        self.assertEqual(markdown_to_typed_blocks("```\nnot closed\n\n# Heading\n\ntext"), [
+            ("```\nnot closed", BlockType.PARAGRAPH),
+            ("# Heading", BlockType.HEADING),
+            ("text", BlockType.PARAGRAPH),
+        ])
+
+    def test_classification_matches_previous_rules(self):
+        import random
+        from benchmarks.blocks import split_and_classify, startswith_block_type
+        rng = random.Random(7)
+        starts = ["#", "##", "#######", "# ", "#\n", "```", "``", ">", "> ", "-", "- ", "* ", "*", "1.", "1. ", "9. ", "10. ", "0. ", "a", " "]
+        for _ in range(3000):
+            block = "".join(rng.choice(starts) for _ in range(rng.randint(1, 4))) + rng.choice(["", "x", " y", "\nz", "```"])
+            self.assertEqual(block_to_block_type(block), startswith_block_type(block), repr(block))
+        from benchmarks.corpus import CorpusGenerator
+        generator = CorpusGenerator(seed=5)
+        for i in range(50):
+            page = generator.page(i)
+            self.assertEqual(markdown_to_typed_blocks(page), split_and_classify(page))
+
+    def test_scan_blocks_streams_lines(self):
+        import io
+        markdown = "a\n\n```\nb\n\nc\n```\n\nd\n"
+        self.assertEqual(list(scan_blocks(io.StringIO(markdown))), markdown_to_typed_blocks(markdown))
+
+    def test_unclosed_fence_is_flushed_while_streaming(self):
+        from unittest import mock
+        import helper
+        consumed = []
+        def lines():
+            for line in ["```", "a", "b", "", "c", "", "d", "", "e"]:
+                consumed.append(line)
+                yield line
+        with mock.patch.object(helper, "MAX_FENCE_LINES", 3):
+            blocks = scan_blocks(lines())
+            self.assertEqual(next(blocks), ("```\na\nb", BlockType.PARAGRAPH))
+            # Given up at the first blank line past the limit, not at the end of the source
+            self.assertEqual(len(consumed), 4)
+            self.assertEqual(list(blocks), [("c", BlockType.PARAGRAPH), ("d", BlockType.PARAGRAPH), ("e", BlockType.PARAGRAPH)])
+        # Below the limit the fence still runs over blank lines to its closing fence
+        self.assertEqual(markdown_to_typed_blocks("```\na\n\nb\n```"), [("```\na\n\nb\n```", BlockType.CODE)])
+
+
+class TestInlineMemo(unittest.TestCase):
+    def setUp(self):
+        import helper
+        self.memo = helper.InlineMemo(max_entries=2, max_text=20)
+        self.original = helper.inline_memo
+        helper.inline_memo = self.memo
+
+    def tearDown(self):
+        import helper
+        helper.inline_memo = self.original
+
+    def test_repeated_text_is_served_from_memo(self):
+        expected = [node.to_html() for node in text_to_children("a [b](/c) **d**")]
+        self.assertEqual(self.memo.entries, {})
+        second = text_to_children("a [b](/c) **d**")
+        third = text_to_children("a [b](/c) **d**")
+        self.assertEqual([node.to_html() for node in third], expected)
+        self.assertEqual([node.to_html("/repo/") for node in third][1], '<a href="/repo/c">b</a>')
+        self.assertEqual((self.memo.hits, self.memo.misses), (1, 2))
+        # Callers get their own list, so appending to it cannot corrupt the memo
+        self.assertIsNot(second, third)
+
+    def test_lru_bound_and_long_text(self):
+        for text in ("a", "b", "a", "b", "c", "c", "a"):
+            text_to_children(text)
+        self.assertEqual(list(self.memo.entries), ["c", "a"])
+        long_text = "x" * 21
+        for _ in range(3):
+            text_to_children(long_text)
+        self.assertNotIn(long_text, self.memo.entries)
+
+    def test_configure_disables(self):
+        import helper
+        for _ in range(2):
+            text_to_children("a")
+        helper.configure_inline_memo(0)
+        self.assertEqual(self.memo.entries, {})
+        text_to_children("a")
+        self.assertEqual((self.memo.hits, self.memo.misses), (0, 2))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,30 @@
+import os
+import tempfile
+import unittest
+
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+
+class SiteTestCase(unittest.TestCase):
+    # Gives each test a fresh temporary directory, self.root. With chdir set
+    # the test also runs inside it, like a build started from a checkout.
+    chdir = False
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = self.tmp.name
+        if self.chdir:
+            self.addCleanup(os.chdir, os.getcwd())
+            os.chdir(self.root)
+
+    def write(self, path, content):
+        # Relative paths are taken from self.root
+        path = os.path.join(self.root, path)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def read(self, path):
+        with open(os.path.join(self.root, path)) as f:
+            return f.read()
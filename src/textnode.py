@@ -1,6 +1,8 @@
 
 from enum import Enum
 
+from htmlnode import LeafNode
+
 class TextType(Enum):
     TEXT = "text"
     BOLD = "bold"
@@ -18,9 +20,12 @@ class BlockType(Enum):
     ORDERED_LIST = "ordered_list"
 
 class TextNode():
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text: str, text_type: Enum, url: str = None):
         self.text = text
-        self.text_type = TextType(text_type)
+        # Only coerce values that are not already a TextType (e.g. "bold")
+        self.text_type = text_type if text_type.__class__ is TextType else TextType(text_type)
         self.url = url
 
     def __eq__(self, other):
@@ -34,8 +39,6 @@ class TextNode():
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
     
     def to_html_node(self):
-        from htmlnode import LeafNode
-        
         if self.text_type == TextType.TEXT:
             return LeafNode(None, self.text)
         if self.text_type == TextType.BOLD: